@@ -1,65 +1,58 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
-import time
+from fetch_executor import get_default_executor
+from membership_index import get_default_membership
+from price_store import get_default_store
+from signal_db import get_default_db
+from resampler import Resampler
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
+from candle_patterns import CandlePatterns
 
 class BacktestingFramework:
-    def __init__(self):
+    def __init__(self, daily_fills=False, target_pattern='red_long_legged_doji', patterns=None, warmup_history=False):
+        self.price_store = get_default_store()
+        self.indicators = IndicatorEngine({'EMA_21': ('Close', 21)}, cache=get_default_cache())
+        # Target 1 exits on the first HA candle matching this CandlePatterns pattern
+        self.patterns = patterns or CandlePatterns()
+        self.target_pattern = target_pattern
+        self.fetch_executor = get_default_executor()
+        self.membership = get_default_membership()
+        self.signal_db = get_default_db()
+        # Fill entries on the first daily session through the signal high instead of the monthly close
+        self.daily_fills = daily_fills
+        # Opt-in: HA/EMA_21 over the scanner's 15-year history (warmed up) instead of from the signal month;
+        # this changes entries, exits and returns, but reuses the scanners' cached indicators
+        self.warmup_history = warmup_history
+        self.resampler = Resampler(self.price_store)
         self.trades = []
         self.performance_metrics = {}
         
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks with doji detection"""
-        ha_df = df.copy()
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        
-        # Calculate Heikin Ashi body and shadows for doji detection
-        ha_df['HA_Body'] = abs(ha_df['HA_Close'] - ha_df['HA_Open'])
-        ha_df['HA_UpperShadow'] = ha_df['HA_High'] - ha_df[['HA_Open', 'HA_Close']].max(axis=1)
-        ha_df['HA_LowerShadow'] = ha_df[['HA_Open', 'HA_Close']].min(axis=1) - ha_df['HA_Low']
-        
-        # Detect long-legged doji (red/bearish)
-        ha_df['HA_TotalRange'] = ha_df['HA_High'] - ha_df['HA_Low']
-        ha_df['Is_Red_Doji'] = (
-            (ha_df['HA_Close'] < ha_df['HA_Open']) &  # Red candle
-            (ha_df['HA_Body'] <= 0.1 * ha_df['HA_TotalRange']) &  # Small body (doji)
-            (ha_df['HA_UpperShadow'] >= 0.3 * ha_df['HA_TotalRange']) &  # Long upper shadow
-            (ha_df['HA_LowerShadow'] >= 0.3 * ha_df['HA_TotalRange'])  # Long lower shadow
-        )
-        
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
+    def history_range(self, signal_dt, months_after=24):
+        """Range of bars loaded for a signal: its trade window, or the scanner's 15 years with warmup_history"""
+        if self.warmup_history:
+            end_date = datetime.now()
+            return min(signal_dt, end_date - timedelta(days=15 * 365)), end_date
+        return signal_dt, signal_dt + timedelta(days=months_after * 30)
     
     def fetch_trading_data(self, symbol, signal_date, months_after=24):
         """Fetch data for backtesting from signal date onwards"""
         try:
             signal_dt = datetime.strptime(signal_date, '%Y-%m-%d')
-            start_date = signal_dt
-            end_date = signal_dt + timedelta(days=months_after * 30)
+            start_date, end_date = self.history_range(signal_dt, months_after)
             
-            ticker = yf.Ticker(symbol + '.NS')
-            data = ticker.history(start=start_date, end=end_date, interval='1mo')
+            data = self.price_store.get_history(symbol + '.NS', start_date, end_date, interval='1mo')
             
             if data.empty:
                 return None
             
-            # Calculate Heikin Ashi with doji detection
-            data = self.calculate_heikin_ashi(data)
-            
-            # Calculate 21 EMA
-            data['EMA_21'] = self.calculate_ema(data['Close'], 21)
+            # Heikin Ashi and EMAs in one engine pass (or from the indicator cache)
+            data = self.indicators.compute(data, symbol + '.NS')
+            if self.warmup_history:
+                data = self.price_store._slice(data, signal_dt, signal_dt + timedelta(days=months_after * 30))
+                if data.empty:
+                    return None
             
             return data
             
@@ -67,58 +60,74 @@ class BacktestingFramework:
             print(f"  Error fetching trading data for {symbol}: {e}")
             return None
     
+    def prefetch_trading_data(self, signals_df, months_after=24):
+        """Concurrently load one history per symbol covering all of its signal windows"""
+        windows = signals_df.groupby('Stock_Ticker')['Date'].agg(['min', 'max'])
+        
+        def fetch(symbol):
+            start_date, _ = self.history_range(datetime.strptime(windows.loc[symbol, 'min'], '%Y-%m-%d'), months_after)
+            _, end_date = self.history_range(datetime.strptime(windows.loc[symbol, 'max'], '%Y-%m-%d'), months_after)
+            return self.price_store.get_history(symbol + '.NS', start_date, end_date, interval='1mo')
+        
+        self.fetch_executor.map(fetch, windows.index, label='trading data prefetch')
+    
+    @staticmethod
+    def _first(mask, after=-1):
+        """Index of the first True in `mask` past position `after`, or None"""
+        hits = np.flatnonzero(mask[after + 1:])
+        return after + 1 + hits[0] if len(hits) else None
+    
     def find_entry_point(self, data, signal_high):
         """Find entry point: candle that cuts high of signal candle and is above 21 EMA"""
-        for i in range(len(data)):
-            current = data.iloc[i]
-            
-            # Check if current candle cuts the signal high and is above 21 EMA
-            if (current['High'] > signal_high and 
-                current['Close'] > current['EMA_21'] and
-                not pd.isna(current['EMA_21'])):
-                
-                return i, current['Close']  # Entry at close of the candle
+        ema = data['EMA_21'].to_numpy()
+        close = data['Close'].to_numpy()
+        with np.errstate(invalid='ignore'):
+            i = self._first((data['High'].to_numpy() > signal_high) & (close > ema) & ~np.isnan(ema))
+        if i is None:
+            return None, None
         
-        return None, None
+        return i, close[i]  # Entry at close of the candle
+    
+    def find_daily_fill(self, symbol, entry_month, signal_high):
+        """Intra-month fill: first daily session of the entry month that trades above the signal high"""
+        start_date = entry_month.tz_localize(None).to_pydatetime()
+        end_date = (entry_month + pd.DateOffset(months=1)).tz_localize(None).to_pydatetime()
+        daily = self.price_store.get_history(symbol + '.NS', start_date, end_date, interval='1d')
+        if daily.empty:
+            return None, None
+        return Resampler.breakout_fill(self.resampler.period_paths(daily), signal_high)
+    
+    def closes_below_ema(self, data):
+        """Boolean mask of candles that close below the 21 EMA"""
+        with np.errstate(invalid='ignore'):
+            return data['Close'].to_numpy() < data['EMA_21'].to_numpy()
     
     def find_stop_loss(self, data, entry_idx):
         """Find stop loss: monthly candle closes below 21 EMA"""
-        for i in range(entry_idx + 1, len(data)):
-            current = data.iloc[i]
-            
-            if current['Close'] < current['EMA_21']:
-                return i, current['Close'], 'Stop Loss'
+        i = self._first(self.closes_below_ema(data), entry_idx)
+        if i is None:
+            return None, None, None
         
-        return None, None, None
+        return i, data['Close'].iloc[i], 'Stop Loss'
     
     def find_target_1(self, data, entry_idx):
-        """Find Target 1: first red long-legged doji Heikin Ashi"""
-        for i in range(entry_idx + 1, len(data)):
-            current = data.iloc[i]
-            
-            if current['Is_Red_Doji']:
-                return i, current['Close'], 'Target 1 - Red Doji'
+        """Find Target 1: first red long-legged doji Heikin Ashi (or the configured target pattern)"""
+        mask = self.patterns.frame_masks(data, [self.target_pattern])[self.target_pattern]
+        i = self._first(mask, entry_idx)
+        if i is None:
+            return None, None, None
         
-        return None, None, None
+        reason = 'Target 1 - Red Doji' if self.target_pattern == 'red_long_legged_doji' else f"Target 1 - {self.target_pattern}"
+        return i, data['Close'].iloc[i], reason
     
     def find_target_2(self, data, entry_idx, entry_price):
         """Find Target 2: candle closes below 21 EMA from recent high"""
-        highest_price = entry_price
-        highest_idx = entry_idx
+        # The first close below the 21 EMA after entry; the high since entry does not move it
+        i = self._first(self.closes_below_ema(data), entry_idx)
+        if i is None:
+            return None, None, None
         
-        # Track the highest price after entry
-        for i in range(entry_idx + 1, len(data)):
-            current = data.iloc[i]
-            
-            if current['High'] > highest_price:
-                highest_price = current['High']
-                highest_idx = i
-            
-            # Check if current candle closes below 21 EMA
-            if current['Close'] < current['EMA_21']:
-                return i, current['Close'], 'Target 2 - Below 21 EMA'
-        
-        return None, None, None
+        return i, data['Close'].iloc[i], 'Target 2 - Below 21 EMA'
     
     def backtest_signal(self, symbol, signal_date, signal_high):
         """Backtest a single signal"""
@@ -146,6 +155,12 @@ class BacktestingFramework:
         
         entry_date = data.index[entry_idx].strftime('%Y-%m-%d')
         
+        if self.daily_fills:
+            fill_date, fill_price = self.find_daily_fill(symbol, data.index[entry_idx], signal_high)
+            if fill_date is not None:
+                entry_date = fill_date.strftime('%Y-%m-%d')
+                entry_price = fill_price
+        
         # Find exit points (whichever comes first)
         stop_idx, stop_price, stop_reason = self.find_stop_loss(data, entry_idx)
         target1_idx, target1_price, target1_reason = self.find_target_1(data, entry_idx)
@@ -199,15 +214,23 @@ class BacktestingFramework:
         print("Target 2: Candle closes below 21 EMA from recent high")
         print("=" * 60)
         
-        # Load signals
+        # Load signals (served from the signal database, which imports the file if it changed)
         try:
-            signals_df = pd.read_csv(signals_file)
+            signals_df = self.signal_db.signals_for(signals_file)
         except FileNotFoundError:
             print(f"Signals file {signals_file} not found. Please run full analysis first.")
             return None
         
+        # Signals from months in which the stock was not an index member are not tradable
+        members = self.membership.signal_mask(signals_df)
+        if not members.all():
+            print(f"Skipping {(~members).sum()} signals outside index membership")
+            signals_df = signals_df[members].reset_index(drop=True)
+        
         print(f"Backtesting {len(signals_df)} signals...")
         
+        self.prefetch_trading_data(signals_df)
+        
         # Backtest each signal
         for idx, signal in signals_df.iterrows():
             result = self.backtest_signal(
@@ -222,8 +245,6 @@ class BacktestingFramework:
             # Progress indicator
             if (idx + 1) % 10 == 0:
                 print(f"  Processed {idx + 1}/{len(signals_df)} signals...")
-            
-            time.sleep(0.1)  # Rate limiting
         
         # Convert results to DataFrame
         results_df = pd.DataFrame(self.trades)
@@ -231,6 +252,11 @@ class BacktestingFramework:
         if not results_df.empty:
             # Save results
             results_df.to_csv('backtest_results.csv', index=False)
+            self.signal_db.record_trades(results_df, source='backtest_results.csv',
+                                         params={'signals_file': signals_file,
+                                                 'signals_run': self.signal_db.latest_run(source=signals_file),
+                                                 'target_pattern': self.target_pattern,
+                                                 'warmup_history': self.warmup_history})
             print(f"\nBacktest results saved to 'backtest_results.csv'")
             
             # Generate performance analysis
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta
+
+from fetch_executor import get_default_executor
+from price_store import get_default_store
+
+
+class BulkLoader:
+    """Download many symbols per provider request and store the per-symbol frames in the price store"""
+
+    def __init__(self, price_store=None, chunk_size=50, max_retries=2, retry_delay=2.0, executor=None):
+        self.price_store = price_store or get_default_store()
+        self.executor = executor or get_default_executor()
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def download_chunk(self, symbols, start, end, interval='1mo'):
+        """Download one chunk of symbols in a single provider request"""
+        provider = self.price_store.provider
+        if provider.rate_limited:
+            self.price_store.rate_limiter.acquire()
+        frames = provider.bulk_history(symbols, start, end, interval)
+        if all(frame.empty for frame in frames.values()):
+            raise ValueError(f"no data returned for any of {len(symbols)} symbols")
+        return frames
+
+    def load(self, symbols, start, end, interval='1mo'):
+        """Make sure every symbol's [start, end) history is in the store, fetching chunk-wise
+
+        Only symbols the store cannot already serve are requested. A chunk that
+        raises or comes back entirely empty is retried on its own, as are the
+        symbols a chunk returned no bars for; nothing empty is stored, so they
+        are never mistaken for cached. Symbols that still fail are fetched one
+        by one on the shared FetchExecutor as a last resort.
+        """
+        missing = [s for s in symbols if not self.price_store.has(s, start, end, interval)]
+        if not missing:
+            print(f"All {len(symbols)} symbols served from the local price store")
+            return 0
+
+        chunks = [missing[i:i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)]
+        print(f"Bulk downloading {len(missing)} symbols in {len(chunks)} chunks of up to {self.chunk_size}...")
+
+        stored = 0
+        for attempt in range(self.max_retries + 1):
+            failed = []
+            for chunk in chunks:
+                try:
+                    frames = self.download_chunk(chunk, start, end, interval)
+                except Exception as e:
+                    print(f"  Chunk starting {chunk[0]} failed: {e}")
+                    failed.append(chunk)
+                    continue
+
+                # Symbols a partly failed chunk returned nothing for are retried with the failed chunks
+                empty = []
+                for symbol in chunk:
+                    data = frames.get(symbol)
+                    if data is None or data.empty:
+                        empty.append(symbol)
+                        continue
+                    self.price_store.save(symbol, interval, data, start, end)
+                    stored += 1
+                if empty:
+                    failed.append(empty)
+
+            if not failed:
+                break
+            chunks = failed
+            if attempt < self.max_retries:
+                print(f"  Retrying {sum(len(chunk) for chunk in failed)} symbols from {len(failed)} failed chunks...")
+                time.sleep(self.retry_delay * (attempt + 1))
+        else:
+            leftovers = [symbol for chunk in chunks for symbol in chunk]
+            print(f"  Fetching {len(leftovers)} symbols individually after {self.max_retries} retries")
+            results = self.executor.map(
+                lambda symbol: self.price_store.get_history(symbol, start, end, interval),
+                leftovers, label='history fetch'
+            )
+            stored += sum(1 for data in results.values() if data is not None and not data.empty)
+
+        print(f"Stored {stored} symbols in the local price store")
+        return stored
+
+    def prefetch(self, symbols, years=15, interval='1mo'):
+        """Bulk-load the trailing `years` of history used by the analyzers' fetch_stock_data"""
+        if self.price_store.derive_from_daily:
+            # Higher timeframes are built from daily bars, so daily is all that is downloaded
+            interval = '1d'
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=years * 365)
+        return self.load(list(symbols), start_date, end_date, interval)
@@ -0,0 +1,142 @@
+import numpy as np
+
+from indicators import DOJI_BODY_RATIO, DOJI_SHADOW_RATIO, heikin_ashi_arrays
+
+# Candle columns of a Heikin Ashi frame and of a regular OHLC frame
+HA_CANDLE = ('HA_Open', 'HA_High', 'HA_Low', 'HA_Close')
+OHLC_CANDLE = ('Open', 'High', 'Low', 'Close')
+
+
+def _previous(values):
+    """Values shifted one bar later along the last axis; the first bar gets NaN"""
+    previous = np.full(values.shape, np.nan)
+    previous[..., 1:] = values[..., :-1]
+    return previous
+
+
+class CandlePatterns:
+    """Vectorized candlestick patterns over 1-D [bars] or 2-D [symbols, bars] candle arrays
+
+    Every pattern returns a boolean array shaped like its inputs, so the same
+    call marks one symbol's history or a whole panel, and exit or filter
+    rules can take np.flatnonzero of a mask instead of iterating rows. Bars
+    with NaN prices never match. Ratios are fractions of the candle's range;
+    the defaults reproduce IndicatorEngine's Is_Red_Doji exactly.
+    """
+
+    PATTERNS = [
+        'doji', 'long_legged_doji', 'red_long_legged_doji', 'dragonfly_doji', 'gravestone_doji',
+        'spinning_top', 'bullish_engulfing', 'bearish_engulfing', 'inside_bar',
+    ]
+
+    def __init__(self, doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO,
+                 small_shadow_ratio=0.1, spinning_body_ratio=0.3):
+        self.doji_body_ratio = doji_body_ratio
+        self.doji_shadow_ratio = doji_shadow_ratio
+        self.small_shadow_ratio = small_shadow_ratio
+        self.spinning_body_ratio = spinning_body_ratio
+
+    @staticmethod
+    def _parts(open_, high, low, close):
+        """(body, upper shadow, lower shadow, range) of each candle"""
+        open_, high, low, close = (np.asarray(a, dtype='float64') for a in (open_, high, low, close))
+        body_top = np.maximum(open_, close)
+        body_bottom = np.minimum(open_, close)
+        return np.abs(close - open_), high - body_top, body_bottom - low, high - low
+
+    def doji(self, open_, high, low, close):
+        """Body no larger than doji_body_ratio of the range"""
+        body, _, _, total_range = self._parts(open_, high, low, close)
+        with np.errstate(invalid='ignore'):
+            return body <= self.doji_body_ratio * total_range
+
+    def long_legged_doji(self, open_, high, low, close):
+        """Doji with both shadows at least doji_shadow_ratio of the range"""
+        body, upper, lower, total_range = self._parts(open_, high, low, close)
+        with np.errstate(invalid='ignore'):
+            return (
+                (body <= self.doji_body_ratio * total_range) &
+                (upper >= self.doji_shadow_ratio * total_range) &
+                (lower >= self.doji_shadow_ratio * total_range)
+            )
+
+    def red_long_legged_doji(self, open_, high, low, close):
+        """Long-legged doji that closed below its open (the backtester's Target 1 exit)"""
+        with np.errstate(invalid='ignore'):
+            return (np.asarray(close) < np.asarray(open_)) & self.long_legged_doji(open_, high, low, close)
+
+    def dragonfly_doji(self, open_, high, low, close):
+        """Doji with (almost) no upper shadow"""
+        _, upper, _, total_range = self._parts(open_, high, low, close)
+        with np.errstate(invalid='ignore'):
+            return (self.doji(open_, high, low, close) & (total_range > 0) &
+                    (upper <= self.small_shadow_ratio * total_range))
+
+    def gravestone_doji(self, open_, high, low, close):
+        """Doji with (almost) no lower shadow"""
+        _, _, lower, total_range = self._parts(open_, high, low, close)
+        with np.errstate(invalid='ignore'):
+            return (self.doji(open_, high, low, close) & (total_range > 0) &
+                    (lower <= self.small_shadow_ratio * total_range))
+
+    def spinning_top(self, open_, high, low, close):
+        """Small body (bigger than a doji's) with both shadows longer than the body"""
+        body, upper, lower, total_range = self._parts(open_, high, low, close)
+        with np.errstate(invalid='ignore'):
+            return (
+                (body > self.doji_body_ratio * total_range) &
+                (body <= self.spinning_body_ratio * total_range) &
+                (upper > body) & (lower > body)
+            )
+
+    def _engulfing(self, open_, close):
+        open_, close = np.asarray(open_, dtype='float64'), np.asarray(close, dtype='float64')
+        prev_open, prev_close = _previous(open_), _previous(close)
+        with np.errstate(invalid='ignore'):
+            engulfs = (
+                (np.minimum(open_, close) <= np.minimum(prev_open, prev_close)) &
+                (np.maximum(open_, close) >= np.maximum(prev_open, prev_close)) &
+                (np.abs(close - open_) > np.abs(prev_close - prev_open))
+            )
+        return open_, close, prev_open, prev_close, engulfs
+
+    def bullish_engulfing(self, open_, high, low, close):
+        """Green body that engulfs the previous bar's red body"""
+        open_, close, prev_open, prev_close, engulfs = self._engulfing(open_, close)
+        with np.errstate(invalid='ignore'):
+            return engulfs & (close > open_) & (prev_close < prev_open)
+
+    def bearish_engulfing(self, open_, high, low, close):
+        """Red body that engulfs the previous bar's green body"""
+        open_, close, prev_open, prev_close, engulfs = self._engulfing(open_, close)
+        with np.errstate(invalid='ignore'):
+            return engulfs & (close < open_) & (prev_close > prev_open)
+
+    def inside_bar(self, open_, high, low, close):
+        """High and low both inside the previous bar's range"""
+        high, low = np.asarray(high, dtype='float64'), np.asarray(low, dtype='float64')
+        with np.errstate(invalid='ignore'):
+            return (high < _previous(high)) & (low > _previous(low))
+
+    def masks(self, open_, high, low, close, patterns=None):
+        """{pattern: boolean array} for the requested (default: all) patterns"""
+        patterns = self.PATTERNS if patterns is None else patterns
+        return {name: getattr(self, name)(open_, high, low, close) for name in patterns}
+
+    def frame_masks(self, data, patterns=None, heikin_ashi=True):
+        """masks() over a frame's HA candles (or its regular OHLC candles)"""
+        columns = HA_CANDLE if heikin_ashi else OHLC_CANDLE
+        return self.masks(*(data[c].to_numpy(dtype='float64') for c in columns), patterns=patterns)
+
+    def panel_masks(self, panel, patterns=None, heikin_ashi=True, columns=None):
+        """masks() over a UniversePanel as [symbols, months] arrays
+
+        HA candles come from `columns` (IndicatorEngine.compute_panel output)
+        when given, and are computed otherwise.
+        """
+        if not heikin_ashi:
+            return self.masks(*(panel.field(c) for c in OHLC_CANDLE), patterns=patterns)
+        if columns is None:
+            columns = heikin_ashi_arrays(*(panel.field(c) for c in OHLC_CANDLE),
+                                         self.doji_body_ratio, self.doji_shadow_ratio)
+        return self.masks(*(columns[c] for c in HA_CANDLE), patterns=patterns)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from indicators import (HA_COLUMNS, MACD_SUFFIXES, IndicatorEngine, ema_array, ha_candle_shape, ha_open_close,
+                        macd_arrays)
+
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CANDLE_COLUMNS = [name for name in HA_COLUMNS if name not in ('HA_Open', 'HA_Close')]
+
+
+class CompactFrame:
+    """One symbol's bars stored as float32 arrays, with indicator columns derived on first access
+
+    Only OHLCV is materialized (Dividends and Stock Splits are dropped).
+    HA_Open/HA_Close, the candle shape columns (HA high/low, body, shadows,
+    range, doji flag) and the engine's EMAs and MACDs are computed in float64 from
+    the stored bars the first time they are read, then kept in the storage
+    dtype. Nothing is copied per step: frame['HA_Close'] returns the cached
+    array itself.
+
+    float32 keeps about 7 significant digits, so a comparison that sits
+    within that of its threshold can come out differently than in float64;
+    pass dtype='float64' where results must match the DataFrame path exactly.
+    """
+
+    def __init__(self, index, columns, engine=None, dtype='float32'):
+        self.index = pd.DatetimeIndex(index)
+        self.dtype = np.dtype(dtype)
+        self.engine = engine or IndicatorEngine()
+        self.values = {name: np.asarray(values, dtype=self.dtype) for name, values in columns.items()}
+
+    @classmethod
+    def from_frame(cls, data, engine=None, dtype='float32'):
+        """Compact copy of the OHLCV columns of a price history frame"""
+        columns = {name: data[name].to_numpy() for name in BASE_COLUMNS if name in data.columns}
+        return cls(data.index, columns, engine=engine, dtype=dtype)
+
+    def seed(self, columns):
+        """Adopt precomputed indicator columns (e.g. from the indicator cache) instead of deriving them
+
+        Values are stored in the frame's dtype and must have one entry per bar.
+        """
+        for name, values in columns.items():
+            if name not in self._derivable():
+                raise KeyError(f"{name} is not an indicator column of this frame")
+            values = np.asarray(values)
+            if len(values) != len(self.index):
+                raise ValueError(f"{name} has {len(values)} values for {len(self.index)} bars")
+            self.values[name] = values if values.dtype == bool else values.astype(self.dtype)
+        return self
+
+    def __len__(self):
+        return len(self.index)
+
+    def _derivable(self):
+        return HA_COLUMNS + list(self.engine.canonical_columns())
+
+    def __contains__(self, name):
+        return name in self.values or name in self._derivable()
+
+    @property
+    def columns(self):
+        """Every column this frame can serve, materialized or not"""
+        return list(self.values) + [name for name in self._derivable() if name not in self.values]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the materialized columns"""
+        return sum(values.nbytes for values in self.values.values())
+
+    def _wide(self, name):
+        return self[name].astype('float64')
+
+    def _derive(self, name):
+        engine = self.engine
+        if name in ('HA_Open', 'HA_Close'):
+            ha_open, ha_close = ha_open_close(*(self._wide(c) for c in ['Open', 'High', 'Low', 'Close']))
+            return {'HA_Open': ha_open, 'HA_Close': ha_close}
+        if name in CANDLE_COLUMNS:
+            return ha_candle_shape(self._wide('HA_Open'), self._wide('HA_Close'), self._wide('High'), self._wide('Low'),
+                                   engine.doji_body_ratio, engine.doji_shadow_ratio)
+        if name in engine.emas:
+            source, span = engine.emas[name]
+            return {name: ema_array(self._wide(source), span)}
+        for prefix, (source, fast, slow, signal) in engine.macds.items():
+            if name in [prefix + suffix for suffix in MACD_SUFFIXES.values()]:
+                return {prefix + MACD_SUFFIXES[column]: values
+                        for column, values in macd_arrays(self._wide(source), fast, slow, signal).items()}
+        raise KeyError(name)
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            for column, values in self._derive(name).items():
+                self.values[column] = values if values.dtype == bool else values.astype(self.dtype)
+        return self.values[name]
+
+    def to_frame(self, columns=None):
+        """pandas view of the requested (default: all) columns, derived as needed"""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self[name] for name in columns}, index=self.index)
@@ -1,37 +1,14 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from price_store import get_default_store
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
 
 class ComprehensiveDebugger:
     def __init__(self):
-        pass
-    
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks"""
-        ha_df = df.copy()
-        
-        # Heikin Ashi Close = (Open + High + Low + Close) / 4
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        
-        # Heikin Ashi Open = (Previous HA Open + Previous HA Close) / 2
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        # Heikin Ashi High = max(High, HA_Open, HA_Close)
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        
-        # Heikin Ashi Low = min(Low, HA_Open, HA_Close)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
+        self.price_store = get_default_store()
+        self.indicators = IndicatorEngine({'EMA_89_HA': ('HA_Close', 89)}, cache=get_default_cache())
     
     def debug_stock_signals(self, symbol, target_dates):
         """Debug specific signals for a stock"""
@@ -41,18 +18,14 @@ class ComprehensiveDebugger:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=15 * 365)
         
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=start_date, end=end_date, interval='1mo')
+        data = self.price_store.get_history(symbol, start_date, end_date, interval='1mo')
         
         if data.empty:
             print(f"No data available for {symbol}")
             return
         
-        # Calculate Heikin Ashi
-        data = self.calculate_heikin_ashi(data)
-        
-        # Calculate 89 EMA on HA_Close
-        data['EMA_89_HA'] = self.calculate_ema(data['HA_Close'], 89)
+        # Heikin Ashi and EMAs in one engine pass
+        data = self.indicators.compute(data, symbol)
         
         print(f"Total data points: {len(data)}")
         print(f"EMA starts from index: {89}")
@@ -1,7 +1,8 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from price_store import get_default_store
+from indicators import IndicatorEngine
 
 def debug_itc_signals():
     """Debug ITC signals to understand the discrepancy"""
@@ -9,27 +10,10 @@ def debug_itc_signals():
     print("=== DEBUGGING ITC SIGNALS ===")
     
     # Fetch ITC data
-    ticker = yf.Ticker('ITC.NS')
-    data = ticker.history(start='2020-01-01', end='2022-01-01', interval='1mo')
+    data = get_default_store().get_history('ITC.NS', '2020-01-01', '2022-01-01', interval='1mo')
     
-    # Calculate Heikin Ashi
-    def calculate_heikin_ashi(df):
-        ha_df = df.copy()
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        return ha_df
-    
-    data = calculate_heikin_ashi(data)
-    
-    # Calculate 89 EMA on HA_Close
-    data['EMA_89_HA'] = data['HA_Close'].ewm(span=89).mean()
+    # Heikin Ashi and 89 EMA on HA_Close
+    data = IndicatorEngine({'EMA_89_HA': ('HA_Close', 89)}).compute(data)
     
     # Filter for 2021 data
     data_2021 = data[(data.index >= '2021-01-01') & (data.index <= '2021-12-31')].copy()
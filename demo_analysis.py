@@ -1,72 +1,30 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
+from price_store import get_default_store
+from bulk_loader import BulkLoader
+from universe_registry import get_default_registry
+from membership_index import get_default_membership
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
 
 class DemoStockAnalyzer:
     def __init__(self):
+        self.price_store = get_default_store()
+        self.indicators = IndicatorEngine({'EMA_89': ('HA_Close', 89)}, cache=get_default_cache())
+        self.bulk_loader = BulkLoader(self.price_store)
+        self.registry = get_default_registry()
+        self.membership = get_default_membership()
         self.results = []
         
     def get_sample_stocks(self):
         """Get a sample of major Nifty 500 stocks for demonstration"""
-        sample_stocks = {
-            'RELIANCE.NS': 'Large Cap',
-            'TCS.NS': 'Large Cap', 
-            'HDFCBANK.NS': 'Large Cap',
-            'INFY.NS': 'Large Cap',
-            'HINDUNILVR.NS': 'Large Cap',
-            'ITC.NS': 'Large Cap',
-            'SBIN.NS': 'Large Cap',
-            'BHARTIARTL.NS': 'Large Cap',
-            'KOTAKBANK.NS': 'Large Cap',
-            'LT.NS': 'Large Cap',
-            'ASIANPAINT.NS': 'Large Cap',
-            'AXISBANK.NS': 'Large Cap',
-            'MARUTI.NS': 'Large Cap',
-            'SUNPHARMA.NS': 'Large Cap',
-            'ULTRACEMCO.NS': 'Large Cap',
-            'WIPRO.NS': 'Large Cap',
-            'NESTLEIND.NS': 'Large Cap',
-            'TITAN.NS': 'Large Cap',
-            'POWERGRID.NS': 'Large Cap',
-            'NTPC.NS': 'Large Cap',
-            'TATAMOTORS.NS': 'Mid Cap',
-            'JSWSTEEL.NS': 'Mid Cap',
-            'ADANIPORTS.NS': 'Mid Cap',
-            'GRASIM.NS': 'Mid Cap',
-            'CIPLA.NS': 'Mid Cap'
-        }
+        sample_stocks = self.registry.universe('sample')
         
         print(f"Using sample of {len(sample_stocks)} major Nifty 500 stocks for demonstration")
         return sample_stocks
     
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks"""
-        ha_df = df.copy()
-        
-        # Heikin Ashi Close = (Open + High + Low + Close) / 4
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        
-        # Heikin Ashi Open = (Previous HA Open + Previous HA Close) / 2
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        # Heikin Ashi High = max(High, HA_Open, HA_Close)
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        
-        # Heikin Ashi Low = min(Low, HA_Open, HA_Close)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
-    
+
     def fetch_stock_data(self, symbol, years=15):
         """Fetch monthly stock data for the specified number of years"""
         try:
@@ -74,18 +32,14 @@ class DemoStockAnalyzer:
             start_date = end_date - timedelta(days=years * 365)
             
             print(f"  Fetching data for {symbol}...")
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(start=start_date, end=end_date, interval='1mo')
+            data = self.price_store.get_history(symbol, start_date, end_date, interval='1mo')
             
             if data.empty:
                 print(f"  No data available for {symbol}")
                 return None
                 
-            # Calculate Heikin Ashi
-            data = self.calculate_heikin_ashi(data)
-            
-            # Calculate 89 EMA on Heikin Ashi close
-            data['EMA_89'] = self.calculate_ema(data['HA_Close'], 89)
+            # Heikin Ashi and EMAs in one engine pass
+            data = self.indicators.compute(data, symbol)
             
             print(f"  Successfully processed {len(data)} monthly candles for {symbol}")
             return data
@@ -104,7 +58,8 @@ class DemoStockAnalyzer:
             return
         
         # Find signals where Heikin Ashi close is above 89 EMA
-        signals = data[data['HA_Close'] > data['EMA_89']].copy()
+        members = self.membership.member_mask(symbol, data.index, interval='1mo')
+        signals = data[(data['HA_Close'] > data['EMA_89']) & members].copy()
         
         if not signals.empty:
             print(f"  Found {len(signals)} signals for {symbol}")
@@ -118,8 +73,6 @@ class DemoStockAnalyzer:
                 })
         else:
             print(f"  No signals found for {symbol}")
-        
-        time.sleep(1)  # Rate limiting
     
     def run_analysis(self):
         """Run the complete analysis"""
@@ -130,6 +83,11 @@ class DemoStockAnalyzer:
         
         # Get sample stock list
         stocks = self.get_sample_stocks()
+        # Skip stocks that were never index members during the scan window
+        stocks = self.membership.filter_members(stocks)
+
+        # Pull every uncached history in multi-ticker chunks before the per-stock loop
+        self.bulk_loader.prefetch(stocks.keys())
         
         # Analyze each stock
         for symbol, market_cap in stocks.items():
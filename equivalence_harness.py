@@ -0,0 +1,226 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import legacy_reference as legacy
+from backtesting_framework import BacktestingFramework
+from indicators import HA_COLUMNS, IndicatorEngine, ema_array, heikin_ashi_arrays
+from market_data import SyntheticProvider
+from price_store import get_default_store
+from rule_dsl import get_rule
+
+UNIVERSE_SIZES = [50, 500, 2000]
+INTERVALS = ['1mo', '1d']
+REPORT_FILE = 'equivalence_report.csv'
+
+
+def _align(frames):
+    """(union calendar, {symbol: positions of its bars in the calendar})"""
+    calendar = None
+    for data in frames.values():
+        calendar = data.index if calendar is None else calendar.union(data.index)
+    return calendar, {symbol: calendar.get_indexer(data.index) for symbol, data in frames.items()}
+
+
+def _stack(frames, positions, n_bars, column):
+    """[symbols, bars] array of one column on the union calendar, NaN where a symbol has no bar"""
+    values = np.full((len(frames), n_bars), np.nan)
+    for row, (symbol, data) in enumerate(frames.items()):
+        values[row, positions[symbol]] = data[column].to_numpy(dtype='float64')
+    return values
+
+
+class EquivalenceHarness:
+    """Checks each vectorized kernel against its legacy row-loop implementation
+
+    Both sides get the same OHLCV, either synthetic (SyntheticProvider) or
+    whatever the price store has cached. Every kernel is run on the whole
+    universe; the legacy code, which is far slower, on the first
+    `legacy_sample` symbols only, and its universe-wide time is extrapolated
+    linearly (it processes one symbol at a time). Results on the sample must
+    agree within rtol/atol, otherwise run() raises AssertionError. Time and
+    peak traced memory are measured in separate runs so tracemalloc does not
+    distort the timings; the legacy peak is the sample's, not extrapolated.
+    A kernel's prepare_<kernel>() step, if any, feeds both sides and is not timed.
+    """
+
+    KERNELS = ['heikin_ashi', 'ema', 'breakout', 'exits']
+
+    def __init__(self, legacy_sample=10, rtol=1e-9, atol=1e-9, seed=42):
+        self.legacy_sample = legacy_sample
+        self.rtol = rtol
+        self.atol = atol
+        self.seed = seed
+        self.backtester = BacktestingFramework()
+
+    def load_universe(self, n_symbols, interval='1mo', source='synthetic'):
+        """{symbol: OHLCV frame} for `n_symbols` synthetic or cached symbols"""
+        if source == 'synthetic':
+            provider = SyntheticProvider(n_symbols=n_symbols, seed=self.seed)
+            return {symbol: provider.generate(symbol, interval) for symbol in provider.constituents()}
+        store = get_default_store()
+        frames = {}
+        for symbol in store.cached_symbols(interval)[:n_symbols]:
+            data = store.load(symbol, interval)
+            if data is not None and not data.empty:
+                frames[symbol] = data
+        return frames
+
+    @staticmethod
+    def _measure(fn, *args):
+        """(result, seconds, peak traced bytes) of fn(*args)"""
+        start = time.perf_counter()
+        fn(*args)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, seconds, peak
+
+    def _max_diff(self, expected, actual):
+        """Largest absolute difference, or inf when the values are not allclose (NaNs must match)"""
+        expected, actual = np.asarray(expected, dtype='float64'), np.asarray(actual, dtype='float64')
+        if expected.shape != actual.shape or not np.allclose(expected, actual, rtol=self.rtol, atol=self.atol,
+                                                             equal_nan=True):
+            return np.inf
+        both = ~np.isnan(expected)
+        return float(np.max(np.abs(expected[both] - actual[both]), initial=0.0))
+
+    # Legacy and vectorized sides of each kernel: both return {symbol: result}
+
+    def legacy_heikin_ashi(self, frames):
+        return {symbol: legacy.calculate_heikin_ashi(data)[HA_COLUMNS] for symbol, data in frames.items()}
+
+    def vectorized_heikin_ashi(self, frames):
+        calendar, positions = _align(frames)
+        columns = heikin_ashi_arrays(*(_stack(frames, positions, len(calendar), c) for c in ['Open', 'High', 'Low', 'Close']))
+        return {symbol: {name: columns[name][row, positions[symbol]] for name in HA_COLUMNS}
+                for row, symbol in enumerate(frames)}
+
+    def compare_heikin_ashi(self, expected, actual):
+        return max(self._max_diff(expected[name].to_numpy(dtype='float64'), actual[name]) for name in HA_COLUMNS)
+
+    def legacy_ema(self, frames):
+        return {symbol: {span: legacy.calculate_ema(data['Close'], span).to_numpy() for span in (21, 89)}
+                for symbol, data in frames.items()}
+
+    def vectorized_ema(self, frames):
+        calendar, positions = _align(frames)
+        close = _stack(frames, positions, len(calendar), 'Close')
+        emas = {span: ema_array(close, span) for span in (21, 89)}
+        return {symbol: {span: emas[span][row, positions[symbol]] for span in (21, 89)}
+                for row, symbol in enumerate(frames)}
+
+    def compare_ema(self, expected, actual):
+        return max(self._max_diff(expected[span], actual[span]) for span in expected)
+
+    def legacy_breakout(self, frames):
+        signals = {}
+        for symbol, data in frames.items():
+            data = legacy.calculate_heikin_ashi(data)
+            data['EMA_89_HA_Close'] = legacy.calculate_ema(data['HA_Close'], 89)
+            signals[symbol] = [i for i in range(92, len(data)) if legacy.check_improved_criteria(data, i)[0]]
+        return signals
+
+    def vectorized_breakout(self, frames):
+        rule = get_rule('improved')
+        engine = IndicatorEngine(rule.emas)
+        return {symbol: list(rule.signals(data)[0]) for symbol, data in engine.compute_batch(frames).items()}
+
+    def compare_breakout(self, expected, actual):
+        return 0.0 if list(expected) == list(actual) else np.inf
+
+    def prepare_exits(self, frames):
+        """Indicator frames with the backtester's EMA_21 and a signal high 5% above the first bar (untimed)"""
+        engine = IndicatorEngine({'EMA_21': ('Close', 21)})
+        return {symbol: (data, data['High'].iloc[0] * 1.05) for symbol, data in engine.compute_batch(frames).items()}
+
+    def legacy_exits(self, prepared):
+        results = {}
+        for symbol, (data, signal_high) in prepared.items():
+            entry_idx, entry_price = legacy.find_entry_point(data, signal_high)
+            if entry_idx is None:
+                results[symbol] = None
+                continue
+            results[symbol] = (entry_idx, entry_price,
+                               legacy.find_stop_loss(data, entry_idx),
+                               legacy.find_target_1(data, entry_idx),
+                               legacy.find_target_2(data, entry_idx, entry_price))
+        return results
+
+    def vectorized_exits(self, prepared):
+        backtester = self.backtester
+        results = {}
+        for symbol, (data, signal_high) in prepared.items():
+            entry_idx, entry_price = backtester.find_entry_point(data, signal_high)
+            if entry_idx is None:
+                results[symbol] = None
+                continue
+            results[symbol] = (entry_idx, entry_price,
+                               backtester.find_stop_loss(data, entry_idx),
+                               backtester.find_target_1(data, entry_idx),
+                               backtester.find_target_2(data, entry_idx, entry_price))
+        return results
+
+    def compare_exits(self, expected, actual):
+        return 0.0 if expected == actual else np.inf
+
+    def run_kernel(self, kernel, frames, interval):
+        """One report row for a kernel on a universe; raises AssertionError on disagreement"""
+        bars = sum(len(data) for data in frames.values())
+        prepare = getattr(self, f'prepare_{kernel}', None)
+        if prepare is not None:
+            frames = prepare(frames)
+        sample = dict(list(frames.items())[:self.legacy_sample])
+        vectorized, vectorized_seconds, vectorized_peak = self._measure(getattr(self, f'vectorized_{kernel}'), frames)
+        expected, legacy_seconds, legacy_peak = self._measure(getattr(self, f'legacy_{kernel}'), sample)
+        legacy_seconds *= len(frames) / len(sample)
+
+        compare = getattr(self, f'compare_{kernel}')
+        diffs = {symbol: compare(expected[symbol], vectorized[symbol]) for symbol in sample}
+        failed = [symbol for symbol, diff in diffs.items() if not np.isfinite(diff)]
+        if failed:
+            raise AssertionError(f"{kernel} ({interval}, {len(frames)} symbols) disagrees with legacy for {failed}")
+
+        return {
+            'kernel': kernel,
+            'interval': interval,
+            'symbols': len(frames),
+            'bars': bars,
+            'vectorized_seconds': round(vectorized_seconds, 4),
+            'legacy_seconds_est': round(legacy_seconds, 4),
+            'speedup': round(legacy_seconds / max(vectorized_seconds, 1e-9), 1),
+            'vectorized_peak_mb': round(vectorized_peak / 2**20, 1),
+            'legacy_sample_peak_mb': round(legacy_peak / 2**20, 1),
+            'max_abs_diff': max(diffs.values()),
+        }
+
+    def run(self, sizes=UNIVERSE_SIZES, intervals=INTERVALS, kernels=None, source='synthetic', output=REPORT_FILE):
+        """Run every kernel at every universe size and interval; returns (and saves) the report"""
+        kernels = self.KERNELS if kernels is None else kernels
+        rows = []
+        for interval in intervals:
+            for size in sizes:
+                frames = self.load_universe(size, interval, source)
+                if not frames:
+                    print(f"No {interval} data for {source} universe of {size}")
+                    continue
+                for kernel in kernels:
+                    row = self.run_kernel(kernel, frames, interval)
+                    rows.append(row)
+                    print(f"{kernel:12s} {interval:3s} {row['symbols']:5d} symbols: "
+                          f"{row['vectorized_seconds']:8.3f}s vs ~{row['legacy_seconds_est']:9.1f}s legacy "
+                          f"({row['speedup']}x), peak {row['vectorized_peak_mb']} MB vs {row['legacy_sample_peak_mb']} MB on the sample, "
+                          f"max diff {row['max_abs_diff']:.2e}")
+        report = pd.DataFrame(rows)
+        if output:
+            report.to_csv(output, index=False)
+            print(f"Equivalence report saved to '{output}'")
+        return report
+
+
+if __name__ == "__main__":
+    EquivalenceHarness().run()
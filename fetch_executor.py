@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate=2.0, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are available; return False if `timeout` seconds pass first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class FetchExecutor:
+    """Thread pool for network fetches with a bounded number of in-flight requests and per-request timeouts
+
+    Rate limiting itself happens where the request is made (PriceStore.fetch,
+    BulkLoader.download_chunk) through the shared TokenBucket, so cache hits
+    never consume tokens.
+    """
+
+    def __init__(self, max_workers=8, timeout=60.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Spare threads so abandoned (hung) calls do not starve new submissions
+        self.pool = ThreadPoolExecutor(max_workers=max_workers * 2, thread_name_prefix='fetch')
+        self.in_flight = threading.Semaphore(max_workers)
+
+    def _submit(self, fn, *args, **kwargs):
+        """Submit once an in-flight slot is free
+
+        The slot is returned when the call finishes or when it exceeds the
+        per-request timeout, whichever comes first.
+        """
+        self.in_flight.acquire()
+        lock = threading.Lock()
+        released = []
+
+        def release(_future=None):
+            with lock:
+                if released:
+                    return
+                released.append(True)
+            watchdog.cancel()
+            self.in_flight.release()
+
+        watchdog = threading.Timer(self.timeout, release)
+        watchdog.daemon = True
+        watchdog.start()
+        future = self.pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(release)
+        return future
+
+    def map(self, fn, items, label='fetch'):
+        """Run fn(item) for every item concurrently and return {item: result}
+
+        Items that raise or exceed the per-request timeout map to None. A timed
+        out call is abandoned and its slot handed back so one hung symbol
+        cannot stall the run.
+        """
+        items = list(items)
+        submitted = []
+        for item in items:
+            future = self._submit(fn, item)
+            submitted.append((item, future, time.monotonic() + self.timeout))
+
+        results = {}
+        for item, future, deadline in submitted:
+            try:
+                results[item] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"  Timed out during {label} of {item} after {self.timeout:g}s")
+                results[item] = None
+            except Exception as e:
+                print(f"  Error during {label} of {item}: {e}")
+                results[item] = None
+        return results
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_default_limiter = None
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_default_limiter():
+    """Return the process-wide token bucket guarding requests to the data provider"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = TokenBucket(rate=2.0, capacity=5)
+        return _default_limiter
+
+
+def get_default_executor():
+    """Return the process-wide FetchExecutor shared by analyzers and the backtester"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = FetchExecutor()
+        return _default_executor
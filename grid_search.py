@@ -0,0 +1,270 @@
+import itertools
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from candle_patterns import HA_CANDLE, CandlePatterns
+from indicators import IndicatorEngine, ema_array, heikin_ashi_arrays
+from membership_index import get_default_membership
+from price_store import DEFAULT_STORE_ROOT
+from rule_dsl import SignalRule, breakout_config
+from universe_panel import UniversePanel
+from universe_registry import get_default_registry
+from universe_scan import pack_bars
+
+DEFAULT_WORKSPACE = os.path.join(DEFAULT_STORE_ROOT, 'grid_workspace')
+RESULTS_FILE = 'grid_search_results.csv'
+
+# Parameter ranges swept by default (216 combinations); the strategy's own values are included
+DEFAULT_GRID = {
+    'ema_span': [55, 89, 144],
+    'confirm_months': [1, 2],
+    'min_strength': [0.5, 1.0, 2.0],
+    'exit_ema_span': [13, 21, 34],
+    'target_pattern': ['red_long_legged_doji', None],
+    'months_after': [12, 24],
+}
+RULE_PARAMETERS = ['ema_span', 'confirm_months', 'min_strength']
+EXIT_PARAMETERS = ['exit_ema_span', 'target_pattern', 'months_after']
+
+
+def breakout_rule(ema_span=89, confirm_months=2, min_strength=1.0):
+    """The monthly breakout rule with its span, below-EMA confirmation months and strength threshold as parameters
+
+    ema_span=89, confirm_months=2, min_strength=1.0 is RULES['improved'].
+    """
+    return SignalRule(**breakout_config(ema_span, confirm_months, min_strength))
+
+
+class GridWorkspace:
+    """Precomputed packed [symbols, bars] arrays in a directory of .npy files, memory-mapped on access
+
+    Worker processes open the same files by path, so the indicators are
+    computed once by the parent and never pickled.
+    """
+
+    def __init__(self, path=DEFAULT_WORKSPACE):
+        self.path = path
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+        return self._arrays[name]
+
+    def save(self, name, values):
+        np.save(os.path.join(self.path, f"{name}.npy"), values)
+
+    @property
+    def meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+_workspace = None
+
+
+def _init_worker(path):
+    global _workspace
+    _workspace = GridWorkspace(path)
+
+
+def _first(mask):
+    """Per row, the first True column of a 2-D mask, or -1"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+
+def _trades(workspace, rows, bars, exit_ema_span, target_pattern, months_after, warmup_history=False):
+    """(completed mask, rounded return %) of the backtester's trade for each signal, all signals at once
+
+    Mirrors BacktestingFramework.backtest_signal on monthly bars: entry on
+    the first bar that trades above the signal high and closes above the
+    exit EMA, exit at the first later close below it or the first target
+    pattern, else at the last bar within months_after * 30 days. As in the
+    backtester, the exit EMA and HA candles start at the signal bar unless
+    `warmup_history`, which reads them from the full-history arrays.
+    """
+    dates = workspace['dates']
+    width = dates.shape[1]
+    # Bars b .. b+window-1 of each signal's row; a 30-day month always fits in months_after + 2 bars
+    offsets = np.arange(months_after + 2)
+    columns = np.minimum(bars[:, None] + offsets, width - 1)
+    signal_dates = dates[rows, bars]
+    in_window = ((bars[:, None] + offsets < width) & (dates[rows[:, None], columns] >= signal_dates[:, None]) &
+                 (dates[rows[:, None], columns] < (signal_dates + np.timedelta64(months_after * 30, 'D'))[:, None]))
+    if len(rows) == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0)
+
+    take = lambda name: np.asarray(workspace[name])[rows[:, None], columns]
+    high, close = take('High'), take('Close')
+    if warmup_history:
+        ema = take(f"EMA_{exit_ema_span}_Close")
+        target = take(target_pattern) if target_pattern is not None else None
+    else:
+        # Each signal's window on its own, as the backtester loads it; both indicators are causal
+        window = {field: np.where(in_window, take(field), np.nan) for field in ['Open', 'High', 'Low', 'Close']}
+        ema = ema_array(window['Close'], exit_ema_span)
+        target = None
+        if target_pattern is not None:
+            candles = heikin_ashi_arrays(*window.values())
+            target = CandlePatterns().masks(*(candles[c] for c in HA_CANDLE), patterns=[target_pattern])[target_pattern]
+    # The backtester reads Signal_High back from the signals CSV, rounded to 2 decimals
+    signal_high = np.round(high[:, :1], 2)
+    with np.errstate(invalid='ignore'):
+        entry = _first(in_window & (high > signal_high) & (close > ema) & ~np.isnan(ema))
+        after_entry = in_window & (offsets > entry[:, None])
+        exits = [_first(after_entry & (close < ema))]
+    if target is not None:
+        exits.append(_first(after_entry & target))
+    exits = np.stack([np.where(e < 0, len(offsets), e) for e in exits])
+    exit_ = exits.min(axis=0)
+    last = len(offsets) - 1 - _first(in_window[:, ::-1])
+    exit_ = np.where(exit_ == len(offsets), last, exit_)
+
+    completed = entry >= 0
+    index = np.arange(len(rows))
+    entry_price = close[index, np.maximum(entry, 0)]
+    exit_price = close[index, exit_]
+    returns = np.round(((exit_price - entry_price) / entry_price) * 100, 2)
+    return completed, np.where(completed, returns, 0.0)
+
+
+def _performance(completed, returns):
+    """The performance_summary.csv metrics of BacktestingFramework.analyze_performance"""
+    total, n_completed = len(completed), int(completed.sum())
+    returns = pd.Series(returns[completed])
+    summary = {'total_signals': total, 'completed_trades': n_completed,
+               'entry_success_rate': (n_completed / total) * 100 if total else np.nan}
+    if n_completed == 0:
+        return {**summary, 'average_return': np.nan, 'win_rate': np.nan, 'sharpe_ratio': np.nan,
+                'max_drawdown': np.nan}
+    return {
+        **summary,
+        'average_return': returns.mean(),
+        'win_rate': (len(returns[returns > 0]) / n_completed) * 100,
+        'sharpe_ratio': returns.mean() / returns.std() if returns.std() > 0 else 0,
+        'max_drawdown': returns.min(),
+    }
+
+
+def _evaluate(task):
+    """Result rows for one rule's parameters and every exit combination under it"""
+    rule_params, exit_combinations = task
+    workspace = _workspace
+    rule = breakout_rule(**rule_params)
+    mask, _ = rule.evaluate(workspace)
+    mask &= np.asarray(workspace['members'])
+    rows, bars = np.nonzero(mask)
+
+    warmup_history = workspace.meta['warmup_history']
+    results = []
+    for exit_params in exit_combinations:
+        completed, returns = _trades(workspace, rows, bars, warmup_history=warmup_history, **exit_params)
+        results.append({**rule_params, **exit_params, **_performance(completed, returns)})
+    return results
+
+
+class GridSearch:
+    """Sweeps the breakout rule's and the backtest exits' parameters over a whole universe
+
+    The rule's indicators (HA once, one EMA per distinct span) are computed
+    once on the packed panel and saved to a GridWorkspace. Exit indicators
+    start at each signal bar, as in the backtester, and are computed per
+    signal window; with `warmup_history` (the backtester's option of the
+    same name) they are precomputed over the full history too. Combinations are grouped by rule parameters, so each
+    distinct rule is evaluated once and all its exit variants reuse its
+    signals, and the groups are spread over a process pool. Each
+    combination gets the backtester's performance summary.
+    """
+
+    def __init__(self, grid=None, workers=None, workspace=DEFAULT_WORKSPACE, warmup_history=False):
+        self.grid = {**DEFAULT_GRID, **(grid or {})}
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.workspace = workspace
+        self.warmup_history = warmup_history
+
+    def tasks(self):
+        """[(rule params, [exit params, ...]), ...] covering every combination"""
+        rule_grid = [dict(zip(RULE_PARAMETERS, values))
+                     for values in itertools.product(*(self.grid[p] for p in RULE_PARAMETERS))]
+        exit_grid = [dict(zip(EXIT_PARAMETERS, values))
+                     for values in itertools.product(*(self.grid[p] for p in EXIT_PARAMETERS))]
+        return [(rule_params, exit_grid) for rule_params in rule_grid]
+
+    def prepare(self, panel, members=None):
+        """Write the packed OHLC, HA, EMAs, membership and bar dates (and full-history exit indicators) for `panel`"""
+        shutil.rmtree(self.workspace, ignore_errors=True)
+        os.makedirs(self.workspace)
+        workspace = GridWorkspace(self.workspace)
+
+        rows, bars, months = pack_bars(panel.valid_mask())
+        shape = (len(panel.symbols), bars.max() + 1 if len(bars) else 0)
+
+        def packed(values, fill=np.nan, dtype='float64'):
+            result = np.full(shape, fill, dtype=dtype)
+            result[rows, bars] = np.asarray(values)[rows, months]
+            return result
+
+        ohlc = {field: packed(panel.field(field)) for field in ['Open', 'High', 'Low', 'Close']}
+        emas = {f"EMA_{span}_HA_Close": ('HA_Close', span) for span in self.grid['ema_span']}
+        if self.warmup_history:
+            emas.update({f"EMA_{span}_Close": ('Close', span) for span in self.grid['exit_ema_span']})
+        columns = IndicatorEngine(emas).compute_arrays(*ohlc.values())
+        for name, values in {**ohlc, **columns}.items():
+            if name in ('HA_Open', 'HA_Close') or name in ohlc or name in emas:
+                workspace.save(name, values)
+
+        if self.warmup_history:
+            patterns = [p for p in self.grid['target_pattern'] if p is not None]
+            for name, mask in CandlePatterns().masks(*(columns[c] for c in HA_CANDLE), patterns=patterns).items():
+                workspace.save(name, mask)
+        members = np.ones(panel.valid_mask().shape, dtype=bool) if members is None else members
+        workspace.save('members', packed(members, fill=False, dtype=bool))
+        workspace.save('dates', packed(np.broadcast_to(panel.dates.values, panel.valid_mask().shape),
+                                       fill=np.datetime64('NaT'), dtype='datetime64[ns]'))
+        with open(os.path.join(self.workspace, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'symbols': panel.symbols, 'grid': self.grid, 'warmup_history': self.warmup_history}, f)
+        return workspace
+
+    def search(self):
+        """Evaluate every combination over the prepared workspace; returns the results table"""
+        tasks = self.tasks()
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.workspace,)) as pool:
+                results = list(pool.map(_evaluate, tasks))
+        else:
+            _init_worker(self.workspace)
+            results = [_evaluate(task) for task in tasks]
+        return pd.DataFrame([row for rows in results for row in rows])
+
+    def run(self, universe='nifty500', years=15, output=RESULTS_FILE, panel_path=None):
+        """Build the universe's panel, precompute once, sweep the grid and save the results table"""
+        registry, membership = get_default_registry(), get_default_membership()
+        stocks = membership.filter_members(registry.universe(universe), years=years)
+        panel = UniversePanel.build(list(stocks), years=years,
+                                    path=panel_path or os.path.join(DEFAULT_STORE_ROOT, f'panel_1mo_{universe}'))
+
+        start = time.perf_counter()
+        self.prepare(panel, members=membership.panel_mask(panel))
+        prepared = time.perf_counter()
+        results = self.search()
+        finished = time.perf_counter()
+        print(f"Grid search: {len(results)} combinations over {len(panel.symbols)} symbols with {self.workers} workers "
+              f"(precompute {prepared - start:.1f}s, sweep {finished - prepared:.1f}s)")
+
+        results['target_pattern'] = results['target_pattern'].fillna('none')
+        results.to_csv(output, index=False)
+        print(f"Results saved to '{output}'")
+        print("\nTop combinations by average return:")
+        print(results.sort_values('average_return', ascending=False).head(10).to_string(index=False))
+        return results
+
+
+if __name__ == "__main__":
+    GridSearch().run()
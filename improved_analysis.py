@@ -1,72 +1,34 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
+from price_store import get_default_store
+from bulk_loader import BulkLoader
+from universe_registry import get_default_registry
+from membership_index import get_default_membership
+from signal_db import get_default_db
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
+from rule_dsl import get_rule
 
 class ImprovedStockAnalyzer:
     def __init__(self):
+        self.price_store = get_default_store()
+        self.rule = get_rule('improved')
+        self.indicators = IndicatorEngine(self.rule.emas, cache=get_default_cache())
+        self.bulk_loader = BulkLoader(self.price_store)
+        self.registry = get_default_registry()
+        self.membership = get_default_membership()
+        self.signal_db = get_default_db()
         self.results = []
         
     def get_sample_stocks(self):
         """Get a sample of major Nifty 500 stocks for demonstration"""
-        sample_stocks = {
-            'RELIANCE.NS': 'Large Cap',
-            'TCS.NS': 'Large Cap', 
-            'HDFCBANK.NS': 'Large Cap',
-            'INFY.NS': 'Large Cap',
-            'HINDUNILVR.NS': 'Large Cap',
-            'ITC.NS': 'Large Cap',
-            'SBIN.NS': 'Large Cap',
-            'BHARTIARTL.NS': 'Large Cap',
-            'KOTAKBANK.NS': 'Large Cap',
-            'LT.NS': 'Large Cap',
-            'ASIANPAINT.NS': 'Large Cap',
-            'AXISBANK.NS': 'Large Cap',
-            'MARUTI.NS': 'Large Cap',
-            'SUNPHARMA.NS': 'Large Cap',
-            'ULTRACEMCO.NS': 'Large Cap',
-            'WIPRO.NS': 'Large Cap',
-            'NESTLEIND.NS': 'Large Cap',
-            'TITAN.NS': 'Large Cap',
-            'POWERGRID.NS': 'Large Cap',
-            'NTPC.NS': 'Large Cap',
-            'TATAMOTORS.NS': 'Mid Cap',
-            'JSWSTEEL.NS': 'Mid Cap',
-            'ADANIPORTS.NS': 'Mid Cap',
-            'GRASIM.NS': 'Mid Cap',
-            'CIPLA.NS': 'Mid Cap'
-        }
+        sample_stocks = self.registry.universe('sample')
         
         print(f"Using sample of {len(sample_stocks)} major Nifty 500 stocks for IMPROVED analysis")
         return sample_stocks
     
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks"""
-        ha_df = df.copy()
-        
-        # Heikin Ashi Close = (Open + High + Low + Close) / 4
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        
-        # Heikin Ashi Open = (Previous HA Open + Previous HA Close) / 2
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        # Heikin Ashi High = max(High, HA_Open, HA_Close)
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        
-        # Heikin Ashi Low = min(Low, HA_Open, HA_Close)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
-    
+
     def fetch_stock_data(self, symbol, years=15):
         """Fetch monthly stock data for the specified number of years"""
         try:
@@ -74,18 +36,14 @@ class ImprovedStockAnalyzer:
             start_date = end_date - timedelta(days=years * 365)
             
             print(f"  Fetching data for {symbol}...")
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(start=start_date, end=end_date, interval='1mo')
+            data = self.price_store.get_history(symbol, start_date, end_date, interval='1mo')
             
             if data.empty:
                 print(f"  No data available for {symbol}")
                 return None
                 
-            # Calculate Heikin Ashi
-            data = self.calculate_heikin_ashi(data)
-            
-            # Calculate 89 EMA on Heikin Ashi Close
-            data['EMA_89_HA_Close'] = self.calculate_ema(data['HA_Close'], 89)
+            # Heikin Ashi and EMAs in one engine pass
+            data = self.indicators.compute(data, symbol)
             
             print(f"  Successfully processed {len(data)} monthly candles for {symbol}")
             return data
@@ -94,56 +52,6 @@ class ImprovedStockAnalyzer:
             print(f"  Error fetching data for {symbol}: {e}")
             return None
     
-    def check_improved_criteria(self, data, current_idx):
-        """Check IMPROVED criteria with sustained breakout requirement"""
-        if current_idx < 92:  # Need at least 89 months + 2 months for sustained breakout
-            return False, "Insufficient data"
-        
-        # Get current month and previous months data
-        current = data.iloc[current_idx]
-        one_month_ago = data.iloc[current_idx - 1]
-        two_months_ago = data.iloc[current_idx - 2]
-        
-        # Get 89 months ago data (for condition 4)
-        eighty_nine_months_ago = data.iloc[current_idx - 89]
-        
-        criteria_results = []
-        
-        # Condition 1: Monthly HA-Close > Monthly HA-Open
-        cond1 = current['HA_Close'] > current['HA_Open']
-        criteria_results.append(f"HA_Close({current['HA_Close']:.2f}) > HA_Open({current['HA_Open']:.2f}): {cond1}")
-        
-        # Condition 2: Monthly HA-Close > Monthly EMA(Monthly HA_Close, 89)
-        cond2 = current['HA_Close'] > current['EMA_89_HA_Close']
-        criteria_results.append(f"HA_Close({current['HA_Close']:.2f}) > EMA89_HA({current['EMA_89_HA_Close']:.2f}): {cond2}")
-        
-        # Condition 3: Monthly HA-Open <= Monthly EMA(Monthly HA_Close, 89)
-        cond3 = current['HA_Open'] <= current['EMA_89_HA_Close']
-        criteria_results.append(f"HA_Open({current['HA_Open']:.2f}) <= EMA89_HA({current['EMA_89_HA_Close']:.2f}): {cond3}")
-        
-        # Condition 4: 89 months ago Close > 0
-        cond4 = eighty_nine_months_ago['Close'] > 0
-        criteria_results.append(f"89mo ago Close({eighty_nine_months_ago['Close']:.2f}) > 0: {cond4}")
-        
-        # Condition 5: 1 month ago HA-Close < Monthly EMA(Monthly HA_Close, 89)
-        cond5 = one_month_ago['HA_Close'] < one_month_ago['EMA_89_HA_Close']
-        criteria_results.append(f"1mo ago HA_Close({one_month_ago['HA_Close']:.2f}) < EMA89_HA({one_month_ago['EMA_89_HA_Close']:.2f}): {cond5}")
-        
-        # NEW Condition 6: SUSTAINED BREAKOUT - Current month is the FIRST month above EMA
-        # This means 2 months ago was below EMA, ensuring this is a genuine first crossover
-        cond6 = two_months_ago['HA_Close'] <= two_months_ago['EMA_89_HA_Close']
-        criteria_results.append(f"2mo ago HA_Close({two_months_ago['HA_Close']:.2f}) <= EMA89_HA({two_months_ago['EMA_89_HA_Close']:.2f}): {cond6}")
-        
-        # NEW Condition 7: BREAKOUT STRENGTH - HA_Close should be at least 1% above EMA
-        breakout_strength = ((current['HA_Close'] - current['EMA_89_HA_Close']) / current['EMA_89_HA_Close']) * 100
-        cond7 = breakout_strength >= 1.0  # At least 1% above EMA
-        criteria_results.append(f"Breakout strength({breakout_strength:.2f}%) >= 1%: {cond7}")
-        
-        # All conditions must be true
-        all_conditions_met = cond1 and cond2 and cond3 and cond4 and cond5 and cond6 and cond7
-        
-        return all_conditions_met, criteria_results
-    
     def analyze_stock(self, symbol, market_cap):
         """Analyze a single stock for IMPROVED signals"""
         print(f"Analyzing {symbol} ({market_cap}) with IMPROVED criteria...")
@@ -153,54 +61,44 @@ class ImprovedStockAnalyzer:
             print(f"  Skipping {symbol} - insufficient data")
             return
         
-        signals_found = 0
+        # Only months in which the stock was an index member are evaluated
+        members = self.membership.member_mask(symbol, data.index, interval='1mo')
+        # Every month from the rule's start month onwards, evaluated in one vectorized pass
+        indices, report = self.rule.signals(data, members=members)
         
-        # Check each month from index 92 onwards (need 89 months of history + 2 months for sustained breakout)
-        for i in range(92, len(data)):
-            conditions_met, details = self.check_improved_criteria(data, i)
+        for n, (i, details) in enumerate(zip(indices, self.rule.explain(data, indices))):
+            print(f"  SIGNAL FOUND at {data.index[i].strftime('%Y-%m-%d')}")
+            for detail in details:
+                print(f"    {detail}")
             
-            if conditions_met:
-                signals_found += 1
-                current = data.iloc[i]
-                
-                print(f"  SIGNAL FOUND at {data.index[i].strftime('%Y-%m-%d')}")
-                for detail in details:
-                    print(f"    {detail}")
-                
-                self.results.append({
-                    'Date': data.index[i].strftime('%Y-%m-%d'),
-                    'Stock_Ticker': symbol.replace('.NS', ''),
-                    'Market_Cap': market_cap,
-                    'HA_Close': round(current['HA_Close'], 2),
-                    'HA_Open': round(current['HA_Open'], 2),
-                    'EMA_89_HA_Close': round(current['EMA_89_HA_Close'], 2),
-                    'Breakout_Strength_Percent': round(((current['HA_Close'] - current['EMA_89_HA_Close']) / current['EMA_89_HA_Close']) * 100, 2),
-                    'Regular_Close': round(current['Close'], 2)
-                })
-        
-        if signals_found == 0:
+            self.results.append({
+                'Date': data.index[i].strftime('%Y-%m-%d'),
+                'Stock_Ticker': symbol.replace('.NS', ''),
+                'Market_Cap': market_cap,
+                **{column: round(values[n], 2) for column, values in report.items()}
+            })
+        
+        if len(indices) == 0:
             print(f"  No improved signals found for {symbol}")
         else:
-            print(f"  Found {signals_found} improved signals for {symbol}")
-        
-        time.sleep(1)  # Rate limiting
+            print(f"  Found {len(indices)} improved signals for {symbol}")
     
     def run_analysis(self):
         """Run the IMPROVED analysis"""
         print("IMPROVED Nifty 500 Analysis with Sustained Breakout Requirements")
         print("=" * 80)
         print("IMPROVED Conditions (with sustained breakout validation):")
-        print("1. Monthly HA-Close > Monthly HA-Open")
-        print("2. Monthly HA-Close > Monthly EMA(Monthly HA_Close, 89)")
-        print("3. Monthly HA-Open <= Monthly EMA(Monthly HA_Close, 89)")
-        print("4. 89 months ago Close > 0")
-        print("5. 1 month ago HA-Close < Monthly EMA(Monthly HA_Close, 89)")
-        print("6. 2 months ago HA-Close <= Monthly EMA (FIRST CROSSOVER VALIDATION)")
-        print("7. Breakout strength >= 1% above EMA (QUALITY FILTER)")
+        for number, condition in enumerate(self.rule.description, 1):
+            print(f"{number}. {condition}")
         print("=" * 80)
         
         # Get sample stock list
         stocks = self.get_sample_stocks()
+        # Skip stocks that were never index members during the scan window
+        stocks = self.membership.filter_members(stocks)
+
+        # Pull every uncached history in multi-ticker chunks before the per-stock loop
+        self.bulk_loader.prefetch(stocks.keys())
         
         # Analyze each stock
         for symbol, market_cap in stocks.items():
@@ -221,6 +119,7 @@ class ImprovedStockAnalyzer:
             
             # Save to CSV
             results_df.to_csv('improved_nifty500_signals.csv', index=False)
+            self.signal_db.record_signals(results_df, 'improved_nifty500_signals', source='improved_nifty500_signals.csv')
             print(f"\nImproved results saved to 'improved_nifty500_signals.csv'")
             
             # Summary by market cap
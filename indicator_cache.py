@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from indicators import HA_COLUMNS
+from price_store import DEFAULT_STORE_ROOT
+
+DEFAULT_CACHE_ROOT = os.path.join(DEFAULT_STORE_ROOT, 'indicator_cache')
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+class IndicatorCache:
+    """Content-addressed memo of indicator columns with an in-memory LRU and a Parquet tier
+
+    Entries are keyed by (symbol, timeframe, first bar, checksum of the OHLC
+    bars and doji parameters); each holds the HA columns plus every EMA and
+    MACD computed so far under its canonical name, so scripts that name
+    their EMAs differently still share one entry. New price data for the
+    same window changes the checksum, which misses and replaces the
+    window's file on disk.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_ROOT, max_entries=256, persist=True):
+        self.root = root
+        self.max_entries = max_entries
+        self.persist = persist
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def checksum(data, engine):
+        """Digest of the bars (dates and OHLC) and the engine's doji parameters"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(data[OHLC_COLUMNS], index=True).to_numpy().tobytes())
+        digest.update(json.dumps([engine.doji_body_ratio, engine.doji_shadow_ratio]).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _safe_symbol(symbol):
+        return re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+
+    def _key(self, symbol, data, engine, timeframe):
+        return (symbol, timeframe, data.index[0].strftime('%Y%m%d'), self.checksum(data, engine))
+
+    def _path(self, symbol, timeframe, start, checksum):
+        return os.path.join(self.root, timeframe, f"{self._safe_symbol(symbol)}-{start}-{checksum[:20]}.parquet")
+
+    def _window_files(self, symbol, timeframe, start):
+        """Every cache file on disk for a symbol's window starting at `start`"""
+        prefix = f"{self._safe_symbol(symbol)}-{start}"
+        pattern = os.path.join(self.root, timeframe, f"{glob.escape(prefix)}-*.parquet")
+        return [path for path in glob.glob(pattern)
+                if os.path.basename(path).rsplit('-', 1)[0] == prefix]
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _entry(self, key):
+        """Cached columns for a key from memory, then disk; None if absent"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        if not self.persist:
+            return None
+        path = self._path(*key)
+        if not os.path.exists(path):
+            return None
+        try:
+            entry = pd.read_parquet(path)
+        except Exception as e:
+            print(f"  Ignoring unreadable indicator cache file {path}: {e}")
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def lookup(self, symbol, data, engine, timeframe='1mo'):
+        """`data` with the engine's indicator columns from the cache, or None on a miss"""
+        key = self._key(symbol, data, engine, timeframe)
+        entry = self._entry(key)
+        wanted = engine.canonical_columns()
+        if entry is None or any(column not in entry.columns for column in wanted.values()):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result = data.copy()
+        for name in HA_COLUMNS:
+            result[name] = entry[name].to_numpy()
+        for name, column in wanted.items():
+            result[name] = entry[column].to_numpy()
+        return result
+
+    def store(self, symbol, data, result, engine, timeframe='1mo'):
+        """Record an engine result, merging its EMAs into whatever the entry already holds"""
+        key = self._key(symbol, data, engine, timeframe)
+        entry = self._entry(key)
+        entry = pd.DataFrame(index=data.index) if entry is None else entry.copy()
+        for name in HA_COLUMNS:
+            entry[name] = result[name].to_numpy()
+        for name, column in engine.canonical_columns().items():
+            entry[column] = result[name].to_numpy()
+        self._remember(key, entry)
+
+        if self.persist:
+            path = self._path(*key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The window's price data changed: entries for older bars are dead
+            for stale in self._window_files(*key[:3]):
+                if stale != path:
+                    os.remove(stale)
+            tmp_path = path + '.tmp'
+            entry.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Return the process-wide IndicatorCache shared by scanners, backtester and debug scripts"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
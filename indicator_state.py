@@ -0,0 +1,298 @@
+import json
+import os
+import re
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import DEFAULT_EMAS, DOJI_BODY_RATIO, DOJI_SHADOW_RATIO
+from price_store import DEFAULT_STORE_ROOT, get_default_store
+
+DEFAULT_STATE_ROOT = os.path.join(DEFAULT_STORE_ROOT, 'indicator_state')
+
+# Bars kept for rules that look back (the breakout rule reads Close 89 bars back)
+DEFAULT_LOOKBACK = 93
+
+BAR_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _ema_step(weighted, old_wt, cur, alpha):
+    """One pandas ewm(adjust=True) step, in pandas' own operation order so results are bit-identical"""
+    if weighted is None:
+        return cur, 1.0
+    old_wt *= 1.0 - alpha
+    if weighted != cur:
+        weighted = old_wt * weighted + cur
+        weighted /= old_wt + 1.0
+    return weighted, old_wt + 1.0
+
+
+def _ema_alpha(span):
+    """Smoothing factor exactly as pandas derives it from `span`"""
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+class IndicatorState:
+    """Running Heikin Ashi and EMA state for one symbol, advanced one bar at a time
+
+    Holds the previous bar's HA_Open/HA_Close and, per EMA, pandas' running
+    (weighted mean, weight sum) pair, so update() costs O(1) and reproduces
+    IndicatorEngine's full recompute exactly. The state before the newest bar
+    is kept as well: updating with the same date again (an in-progress month
+    that has since closed) replaces that bar instead of appending it.
+    The last `lookback` output rows are kept for rules that look back.
+    """
+
+    def __init__(self, emas=None, lookback=DEFAULT_LOOKBACK,
+                 doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO):
+        self.emas = dict(DEFAULT_EMAS if emas is None else emas)
+        self.lookback = lookback
+        self.doji_body_ratio = doji_body_ratio
+        self.doji_shadow_ratio = doji_shadow_ratio
+        self.bars_seen = 0
+        self.last_date = None
+        self.ha_open = None
+        self.ha_close = None
+        self.ema = {name: [None, 0.0] for name in self.emas}
+        self.previous = None
+        self.rows = deque(maxlen=lookback)
+
+    def _core(self):
+        return {
+            'bars_seen': self.bars_seen,
+            'last_date': self.last_date,
+            'ha_open': self.ha_open,
+            'ha_close': self.ha_close,
+            'ema': {name: list(value) for name, value in self.ema.items()},
+        }
+
+    def _restore(self, core):
+        self.bars_seen = core['bars_seen']
+        self.last_date = core['last_date']
+        self.ha_open = core['ha_open']
+        self.ha_close = core['ha_close']
+        self.ema = {name: list(value) for name, value in core['ema'].items()}
+
+    def update(self, date, open_, high, low, close, volume=np.nan):
+        """Advance every indicator by one bar and return that bar's output row
+
+        A bar dated like the current last bar replaces it; an older one raises
+        ValueError. Bars without a close are skipped, as in the batch engine.
+        """
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date < self.last_date:
+            raise ValueError(f"bar {date} is older than the last bar {self.last_date}")
+        if np.isnan(close):
+            return None
+
+        if self.last_date is not None and date == self.last_date:
+            self._restore(self.previous)
+            self.rows.pop()
+        self.previous = self._core()
+
+        ha_close = (open_ + high + low + close) / 4
+        if self.ha_open is None:
+            ha_open = open_
+        else:
+            # (HA_Open + HA_Close) / 2 as the alpha=0.5, adjust=False ewm step
+            ha_open = self.ha_open
+            if ha_open != self.ha_close:
+                ha_open = (0.5 * ha_open + 0.5 * self.ha_close) / 1.0
+
+        body_top = max(ha_open, ha_close)
+        body_bottom = min(ha_open, ha_close)
+        ha_high = max(high, body_top)
+        ha_low = min(low, body_bottom)
+        total_range = ha_high - ha_low
+        ha_body = abs(ha_close - ha_open)
+        upper_shadow = ha_high - body_top
+        lower_shadow = body_bottom - ha_low
+
+        row = {
+            'Date': date,
+            'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume,
+            'HA_Close': ha_close,
+            'HA_Open': ha_open,
+            'HA_High': ha_high,
+            'HA_Low': ha_low,
+            'HA_Body': ha_body,
+            'HA_UpperShadow': upper_shadow,
+            'HA_LowerShadow': lower_shadow,
+            'HA_TotalRange': total_range,
+            'Is_Red_Doji': bool(
+                ha_close < ha_open and
+                ha_body <= self.doji_body_ratio * total_range and
+                upper_shadow >= self.doji_shadow_ratio * total_range and
+                lower_shadow >= self.doji_shadow_ratio * total_range
+            ),
+        }
+        for name, (source, span) in self.emas.items():
+            weighted, old_wt = _ema_step(*self.ema[name], row[source], _ema_alpha(span))
+            self.ema[name] = [weighted, old_wt]
+            row[name] = weighted
+
+        self.ha_open, self.ha_close = ha_open, ha_close
+        self.last_date = date
+        self.bars_seen += 1
+        self.rows.append(row)
+        return row
+
+    def update_frame(self, data):
+        """Feed every bar of an OHLC frame that is not older than the last bar"""
+        if self.last_date is not None:
+            dates = data.index.tz_localize(None) if data.index.tz is not None else data.index
+            data = data[dates >= self.last_date]
+        for date, bar in zip(data.index, data.itertuples(index=False)):
+            bar = bar._asdict()
+            self.update(date.tz_localize(None) if date.tzinfo is not None else date,
+                        bar['Open'], bar['High'], bar['Low'], bar['Close'], bar.get('Volume', np.nan))
+        return self
+
+    def matches(self, data):
+        """Whether a full history still has the retained bars before the last one, OHLC unchanged
+
+        The last bar itself may legitimately change (an in-progress month);
+        any earlier difference means the history was rewritten, e.g. re-based
+        after a split, and the running state no longer describes it.
+        """
+        settled = list(self.rows)[:-1]
+        if not settled:
+            return True
+        dates = data.index.tz_localize(None) if data.index.tz is not None else data.index
+        fields = ['Open', 'High', 'Low', 'Close']
+        history = pd.DataFrame(data[fields].to_numpy(dtype='float64'), index=dates, columns=fields)
+        history = history[~history.index.duplicated(keep='last')]
+        wanted = pd.DatetimeIndex([row['Date'] for row in settled])
+        if not wanted.isin(history.index).all():
+            return False
+        expected = np.array([[row[field] for field in fields] for row in settled], dtype='float64')
+        return bool(np.isclose(history.loc[wanted].to_numpy(), expected, rtol=1e-6, atol=0, equal_nan=True).all())
+
+    @classmethod
+    def from_frame(cls, data, **kwargs):
+        """State after replaying a symbol's full history"""
+        return cls(**kwargs).update_frame(data)
+
+    def frame(self):
+        """The retained recent rows as a DataFrame indexed by Date"""
+        if not self.rows:
+            return pd.DataFrame()
+        return pd.DataFrame(list(self.rows)).set_index('Date')
+
+    def to_dict(self):
+        def encode(core):
+            core = dict(core)
+            core['last_date'] = core['last_date'].isoformat() if core['last_date'] is not None else None
+            return core
+
+        return {
+            'emas': {name: list(spec) for name, spec in self.emas.items()},
+            'lookback': self.lookback,
+            'doji': [self.doji_body_ratio, self.doji_shadow_ratio],
+            'state': encode(self._core()),
+            'previous': encode(self.previous) if self.previous is not None else None,
+            'rows': [{**row, 'Date': row['Date'].isoformat()} for row in self.rows],
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        state = cls(
+            emas={name: tuple(spec) for name, spec in payload['emas'].items()},
+            lookback=payload['lookback'],
+            doji_body_ratio=payload['doji'][0],
+            doji_shadow_ratio=payload['doji'][1],
+        )
+
+        def decode(core):
+            core = dict(core)
+            core['last_date'] = pd.Timestamp(core['last_date']) if core['last_date'] else None
+            return core
+
+        state._restore(decode(payload['state']))
+        state.previous = decode(payload['previous']) if payload['previous'] is not None else None
+        state.rows.extend({**row, 'Date': pd.Timestamp(row['Date'])} for row in payload['rows'])
+        return state
+
+
+class IndicatorStateStore:
+    """Per-symbol IndicatorState persisted as JSON next to the price store
+
+    JSON floats round-trip exactly, so a reloaded state continues
+    bit-identically.
+    """
+
+    def __init__(self, root=DEFAULT_STATE_ROOT, emas=None, lookback=DEFAULT_LOOKBACK):
+        self.root = root
+        self.emas = dict(DEFAULT_EMAS if emas is None else emas)
+        self.lookback = lookback
+
+    def _path(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, interval, f"{safe_symbol}.json")
+
+    def load(self, symbol, interval='1mo'):
+        """Stored state, or None if there is none or it was built for different EMAs"""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = IndicatorState.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  Ignoring unreadable indicator state for {symbol}: {e}")
+            return None
+        if state.emas != self.emas or state.lookback != self.lookback:
+            return None
+        return state
+
+    def save(self, symbol, state, interval='1mo'):
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def advance(self, symbol, data, interval='1mo'):
+        """Bring a symbol's state up to date with its full history `data`
+
+        Only bars from the stored last bar onwards are applied; without a
+        usable stored state, or when `data` no longer has the bars the state
+        was built from (see IndicatorState.matches), the history is replayed once.
+        """
+        state = self.load(symbol, interval)
+        if state is not None and not state.matches(data):
+            print(f"  {symbol}: history changed before the last stored bar, rebuilding its indicator state")
+            state = None
+        if state is None:
+            state = IndicatorState(emas=self.emas, lookback=self.lookback)
+        state.update_frame(data)
+        self.save(symbol, state, interval)
+        return state
+
+    def advance_all(self, symbols=None, interval='1mo', price_store=None):
+        """Advance the state of every cached symbol from the price store"""
+        price_store = price_store or get_default_store()
+        if symbols is None:
+            symbols = price_store.cached_symbols(interval)
+        advanced = 0
+        for symbol in symbols:
+            data = price_store.load(symbol, interval)
+            if data is None or data.empty:
+                continue
+            try:
+                self.advance(symbol, data, interval)
+                advanced += 1
+            except Exception as e:
+                print(f"  Error advancing indicator state for {symbol}: {e}")
+        print(f"Advanced indicator state for {advanced}/{len(symbols)} symbols ({interval})")
+        return advanced
+
+
+if __name__ == "__main__":
+    # Monthly production refresh: fetch the newest bars, then advance each symbol by them
+    store = get_default_store()
+    store.refresh_all(interval='1mo')
+    IndicatorStateStore().advance_all(interval='1mo', price_store=store)
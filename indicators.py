@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+
+# Long-legged red doji thresholds, as fractions of the HA candle's range
+DOJI_BODY_RATIO = 0.1
+DOJI_SHADOW_RATIO = 0.3
+
+HA_COLUMNS = ['HA_Close', 'HA_Open', 'HA_High', 'HA_Low',
+              'HA_Body', 'HA_UpperShadow', 'HA_LowerShadow', 'HA_TotalRange', 'Is_Red_Doji']
+
+
+def _first_order_filter(x):
+    """y[t] = (y[t-1] + x[t]) / 2 along the last axis, seeded with the first non-NaN x
+
+    This is ewm(alpha=0.5, adjust=False) without decay across NaN gaps, so
+    each row behaves as if its missing bars had been dropped. pandas runs the
+    recurrence in compiled code and 0.5*a + 0.5*b rounds exactly like
+    (a + b) / 2, so the result is bit-identical to the scalar loop.
+    """
+    if x.ndim == 1:
+        return pd.Series(x).ewm(alpha=0.5, adjust=False, ignore_na=True).mean().to_numpy()
+    return pd.DataFrame(x.T).ewm(alpha=0.5, adjust=False, ignore_na=True).mean().to_numpy().T
+
+
+def ha_open_close(open_, high, low, close):
+    """(HA_Open, HA_Close) for 1-D [bars] or 2-D [symbols, bars] OHLC arrays
+
+    NaN bars (before listing, after delisting, gaps in a panel) stay NaN and
+    the HA_Open recurrence continues across them from the previous real bar,
+    exactly as if those rows were not there.
+    """
+    open_, high, low, close = (np.asarray(a, dtype='float64') for a in (open_, high, low, close))
+    valid = ~np.isnan(close)
+
+    ha_close = (open_ + high + low + close) / 4
+
+    # HA_Open[t] = (HA_Open[t-1] + HA_Close[t-1]) / 2 is the filter above applied
+    # to x[t] = HA_Close of the previous real bar, seeded with the first Open
+    prev_close = pd.DataFrame(np.atleast_2d(ha_close).T).ffill().shift(1).to_numpy().T.reshape(ha_close.shape)
+    x = np.where(np.isnan(prev_close), open_, prev_close)
+    x[~valid] = np.nan
+    ha_open = np.where(valid, _first_order_filter(x), np.nan)
+    return ha_open, ha_close
+
+
+def ha_candle_shape(ha_open, ha_close, high, low, doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO):
+    """HA high/low, body, shadows, range and the red long-legged doji flag from HA_Open/HA_Close"""
+    ha_open, ha_close, high, low = (np.asarray(a, dtype='float64') for a in (ha_open, ha_close, high, low))
+    body_top = np.maximum(ha_open, ha_close)
+    body_bottom = np.minimum(ha_open, ha_close)
+    ha_high = np.maximum(high, body_top)
+    ha_low = np.minimum(low, body_bottom)
+
+    ha_body = np.abs(ha_close - ha_open)
+    upper_shadow = ha_high - body_top
+    lower_shadow = body_bottom - ha_low
+    total_range = ha_high - ha_low
+
+    with np.errstate(invalid='ignore'):
+        is_red_doji = (
+            (ha_close < ha_open) &
+            (ha_body <= doji_body_ratio * total_range) &
+            (upper_shadow >= doji_shadow_ratio * total_range) &
+            (lower_shadow >= doji_shadow_ratio * total_range)
+        )
+
+    return {
+        'HA_High': ha_high,
+        'HA_Low': ha_low,
+        'HA_Body': ha_body,
+        'HA_UpperShadow': upper_shadow,
+        'HA_LowerShadow': lower_shadow,
+        'HA_TotalRange': total_range,
+        'Is_Red_Doji': is_red_doji,
+    }
+
+
+def heikin_ashi_arrays(open_, high, low, close, doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO):
+    """Heikin Ashi candles for 1-D [bars] or 2-D [symbols, bars] OHLC arrays
+
+    Returns {column: array} for every name in HA_COLUMNS, shaped like the
+    input.
+    """
+    ha_open, ha_close = ha_open_close(open_, high, low, close)
+    return {
+        'HA_Close': ha_close,
+        'HA_Open': ha_open,
+        **ha_candle_shape(ha_open, ha_close, high, low, doji_body_ratio, doji_shadow_ratio),
+    }
+
+
+def heikin_ashi(df, doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO):
+    """Copy of an OHLC DataFrame with the Heikin Ashi columns (HA_COLUMNS) appended"""
+    ha_df = df.copy()
+    columns = heikin_ashi_arrays(
+        df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(),
+        doji_body_ratio=doji_body_ratio, doji_shadow_ratio=doji_shadow_ratio,
+    )
+    for name, values in columns.items():
+        ha_df[name] = values
+    return ha_df
+
+
+def ema_array(values, span, adjust=True):
+    """EMA along the last axis of a 1-D [bars] or 2-D [symbols, bars] array
+
+    Same weights as Series.ewm(span=span, adjust=adjust).mean(). NaN bars
+    are skipped rather than decayed over and stay NaN in the output, so a
+    panel row gives the same EMA as that symbol's own history without the gaps.
+    """
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        result = pd.Series(values).ewm(span=span, adjust=adjust, ignore_na=True).mean().to_numpy()
+    else:
+        result = pd.DataFrame(values.T).ewm(span=span, adjust=adjust, ignore_na=True).mean().to_numpy().T
+    return np.where(np.isnan(values), np.nan, result)
+
+
+def macd_arrays(values, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram along the last axis of a 1-D or 2-D array
+
+    Uses the conventional recursive EMAs (adjust=False), i.e. the MACD
+    charting platforms show. Returns {'MACD', 'MACD_Signal', 'MACD_Hist'}.
+    """
+    line = ema_array(values, fast, adjust=False) - ema_array(values, slow, adjust=False)
+    signal_line = ema_array(line, signal, adjust=False)
+    return {'MACD': line, 'MACD_Signal': signal_line, 'MACD_Hist': line - signal_line}
+
+
+def ema_matrix(values, spans):
+    """EMAs for a whole vector of spans at once: [symbols, bars] -> [spans, symbols, bars]
+
+    One pass over the bars updates every (span, symbol) pair together with
+    pandas' own ewm(adjust=True, ignore_na=True) recurrence and operation
+    order, so each [span] slice equals ema_array(values, span) bit for bit.
+    A 1-D input gives [spans, bars].
+    """
+    values = np.asarray(values, dtype='float64')
+    squeeze = values.ndim == 1
+    values = np.atleast_2d(values)
+    spans = np.asarray(spans, dtype='float64')
+
+    # Alpha exactly as pandas derives it from span; new bars weigh 1 under adjust=True
+    decay = (1.0 - 1.0 / (1.0 + (spans - 1) / 2.0))[:, None]
+    weighted = np.full((len(spans), values.shape[0]), np.nan)
+    old_wt = np.ones_like(weighted)
+    result = np.full((len(spans),) + values.shape, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        for t in range(values.shape[1]):
+            cur = values[:, t]
+            observed = ~np.isnan(cur)
+            step = observed & ~np.isnan(weighted)
+            decayed = np.where(step, old_wt * decay, old_wt)
+            blended = (decayed * weighted + cur) / (decayed + 1.0)
+            weighted = np.where(step & (weighted != cur), blended, weighted)
+            weighted = np.where(observed & np.isnan(weighted), cur, weighted)
+            old_wt = np.where(step, decayed + 1.0, old_wt)
+            result[:, :, t] = np.where(observed, weighted, np.nan)
+
+    return result[:, 0, :] if squeeze else result
+
+
+# Spans tried by EMA parameter sweeps (the strategy uses 89)
+SWEEP_SPANS = range(13, 145)
+
+# Output column -> (source column, span) computed by default
+DEFAULT_EMAS = {
+    'EMA_89_HA_Close': ('HA_Close', 89),
+    'EMA_21': ('Close', 21),
+}
+
+# Standard MACD periods (fast EMA, slow EMA, signal EMA)
+DEFAULT_MACD = (12, 26, 9)
+MACD_SUFFIXES = {'MACD': '', 'MACD_Signal': '_Signal', 'MACD_Hist': '_Hist'}
+
+
+class IndicatorEngine:
+    """Heikin Ashi plus a set of EMAs for one symbol, a batch of symbols or a whole panel
+
+    `emas` maps each output column to (source column, span); sources can be
+    raw OHLC columns or any HA column. `macds` maps an output prefix to
+    (source column, fast, slow, signal) and adds <prefix>, <prefix>_Signal
+    and <prefix>_Hist. Batches are aligned onto one
+    calendar and computed as 2-D arrays in a single pass. With an
+    IndicatorCache, results for a symbol whose bars were already computed
+    (by this or any other script) are served from it instead.
+    """
+
+    def __init__(self, emas=None, doji_body_ratio=DOJI_BODY_RATIO, doji_shadow_ratio=DOJI_SHADOW_RATIO, cache=None,
+                 macds=None):
+        self.emas = dict(DEFAULT_EMAS if emas is None else emas)
+        self.macds = dict(macds or {})
+        self.doji_body_ratio = doji_body_ratio
+        self.doji_shadow_ratio = doji_shadow_ratio
+        self.cache = cache
+
+    def compute_arrays(self, open_, high, low, close):
+        """{column: array} for HA_COLUMNS and every configured EMA, shaped like the inputs"""
+        columns = heikin_ashi_arrays(open_, high, low, close, self.doji_body_ratio, self.doji_shadow_ratio)
+        sources = {'Open': open_, 'High': high, 'Low': low, 'Close': close, **columns}
+        for name, (source, span) in self.emas.items():
+            columns[name] = ema_array(sources[source], span)
+        for prefix, (source, fast, slow, signal) in self.macds.items():
+            for column, values in macd_arrays(sources[source], fast, slow, signal).items():
+                columns[prefix + MACD_SUFFIXES[column]] = values
+        return columns
+
+    def canonical_columns(self):
+        """{output column: name independent of what this engine calls it} for the EMA and MACD outputs"""
+        columns = {name: f"EMA_{source}_{span}" for name, (source, span) in self.emas.items()}
+        for prefix, (source, fast, slow, signal) in self.macds.items():
+            for column, suffix in MACD_SUFFIXES.items():
+                columns[prefix + suffix] = f"{column}_{source}_{fast}_{slow}_{signal}"
+        return columns
+
+    def compute(self, df, symbol=None, timeframe='1mo'):
+        """Copy of one symbol's OHLC frame with the HA and EMA columns appended
+
+        Pass `symbol` to read and fill the cache.
+        """
+        use_cache = self.cache is not None and symbol is not None and not df.empty
+        if use_cache:
+            result = self.cache.lookup(symbol, df, self, timeframe)
+            if result is not None:
+                return result
+
+        result = df.copy()
+        columns = self.compute_arrays(*(df[c].to_numpy(dtype='float64') for c in ['Open', 'High', 'Low', 'Close']))
+        for name, values in columns.items():
+            result[name] = values
+
+        if use_cache:
+            self.cache.store(symbol, df, result, self, timeframe)
+        return result
+
+    def compute_batch(self, frames, timeframe='1mo'):
+        """{symbol: frame} -> {symbol: frame with indicators}, all uncached symbols computed in one call"""
+        frames = {symbol: data for symbol, data in frames.items() if data is not None and not data.empty}
+        if not frames:
+            return {}
+
+        if self.cache is not None:
+            results = {}
+            for symbol, data in frames.items():
+                result = self.cache.lookup(symbol, data, self, timeframe)
+                if result is not None:
+                    results[symbol] = result
+            missing = {symbol: data for symbol, data in frames.items() if symbol not in results}
+            cache, self.cache = self.cache, None
+            try:
+                computed = self.compute_batch(missing, timeframe)
+            finally:
+                self.cache = cache
+            for symbol, result in computed.items():
+                self.cache.store(symbol, frames[symbol], result, self, timeframe)
+            results.update(computed)
+            return {symbol: results[symbol] for symbol in frames}
+        if not all(data.index.is_unique for data in frames.values()):
+            return {symbol: self.compute(data) for symbol, data in frames.items()}
+
+        calendar = None
+        for data in frames.values():
+            calendar = data.index if calendar is None else calendar.union(data.index)
+        positions = {symbol: calendar.get_indexer(data.index) for symbol, data in frames.items()}
+
+        def stacked(column):
+            values = np.full((len(frames), len(calendar)), np.nan)
+            for row, (symbol, data) in enumerate(frames.items()):
+                values[row, positions[symbol]] = data[column].to_numpy(dtype='float64')
+            return values
+
+        columns = self.compute_arrays(stacked('Open'), stacked('High'), stacked('Low'), stacked('Close'))
+
+        results = {}
+        for row, (symbol, data) in enumerate(frames.items()):
+            result = data.copy()
+            for name, values in columns.items():
+                result[name] = values[row, positions[symbol]]
+            results[symbol] = result
+        return results
+
+    def compute_panel(self, panel):
+        """{column: [symbols, months] array} for a UniversePanel"""
+        return self.compute_arrays(panel.field('Open'), panel.field('High'), panel.field('Low'), panel.field('Close'))
+
+    def ema_sweep(self, panel, spans=SWEEP_SPANS, source='HA_Close'):
+        """[span, symbol, month] EMAs of one source column of a UniversePanel for every span"""
+        ohlc = [panel.field(c) for c in ['Open', 'High', 'Low', 'Close']]
+        if source in HA_COLUMNS:
+            values = heikin_ashi_arrays(*ohlc, self.doji_body_ratio, self.doji_shadow_ratio)[source]
+        else:
+            values = panel.field(source)
+        return ema_matrix(values, spans)
@@ -0,0 +1,156 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from indicator_state import DEFAULT_LOOKBACK, DEFAULT_STATE_ROOT, IndicatorStateStore
+from indicators import DEFAULT_EMAS, IndicatorEngine
+from membership_index import get_default_membership
+from price_store import get_default_store
+from rule_dsl import get_rule
+
+
+def _month(date):
+    return pd.Timestamp(date).to_period('M')
+
+
+class LatestBarScreener:
+    """Evaluates a SignalRule at one month only, the latest by default, from stored IndicatorState
+
+    Each symbol's state already holds its running HA/EMA values and the
+    last DEFAULT_LOOKBACK output rows, which is all the rule reads, so
+    screening a month costs one small window per symbol instead of a
+    recompute of its whole history. The windows are stacked right-aligned
+    and the rule is evaluated on them in one call. Symbols without a stored
+    state, or with an as-of month older than their retained rows allow,
+    are computed from their price history instead (and new states saved);
+    states that end before the screened month are advanced from the price
+    store, and symbols that still have no bar in it are skipped and listed.
+    Run `python indicator_state.py` first to fold in the newest bars.
+    """
+
+    def __init__(self, rule='improved', state_store=None, price_store=None, membership=None):
+        self.rule = get_rule(rule) if isinstance(rule, str) else rule
+        if state_store is None:
+            emas = {**DEFAULT_EMAS, **self.rule.emas}
+            lookback = max(DEFAULT_LOOKBACK, self.rule.lookback + 1)
+            # Rules needing other EMAs keep their own states rather than rebuilding the shared ones
+            custom = emas != DEFAULT_EMAS or lookback != DEFAULT_LOOKBACK
+            root = f"{DEFAULT_STATE_ROOT}_{self.rule.name}" if custom else DEFAULT_STATE_ROOT
+            state_store = IndicatorStateStore(root=root, emas=emas, lookback=lookback)
+        self.state_store = state_store
+        self.price_store = price_store or get_default_store()
+        self.membership = membership or get_default_membership()
+
+    def _history(self, symbol, years):
+        end_date = datetime.now()
+        data = self.price_store.get_history(symbol, end_date - timedelta(days=years * 365), end_date, interval='1mo')
+        if data is None or data.empty:
+            return None
+        if data.index.tz is not None:
+            data = data.tz_localize(None)
+        return data
+
+    def _stored_months(self, symbols):
+        """Months of the newest bars the price store holds for `symbols` (none for uncached providers)"""
+        entries = (self.price_store.manifest.get(self.price_store._key(symbol, '1mo')) for symbol in symbols)
+        return [_month(entry['last_bar']) for entry in entries if entry and entry.get('last_bar')]
+
+    def window(self, symbol, as_of=None, years=15, month=None):
+        """(recent indicator rows up to `as_of` as dicts, number of bars before them), or None without data
+
+        A stored state whose last bar is older than `month` (default: the
+        as-of month) is first advanced with the price store's newer bars.
+        """
+        month = month if month is not None else (_month(as_of) if as_of is not None else None)
+        state = self.state_store.load(symbol)
+        stale = state is not None and month is not None and (not state.rows or _month(state.rows[-1]['Date']) < month)
+        if state is None or stale:
+            data = self._history(symbol, years)
+            if data is not None:
+                state = self.state_store.advance(symbol, data)
+            elif state is None:
+                return None
+
+        rows = list(state.rows)
+        bars_before = state.bars_seen - len(rows)
+        if as_of is not None:
+            cutoff = (_month(as_of) + 1).start_time
+            rows = [row for row in rows if row['Date'] < cutoff]
+            if len(rows) <= self.rule.lookback and bars_before > 0:
+                # The as-of month is older than the stored rows reach back
+                data = self._history(symbol, years)
+                if data is None:
+                    return None
+                data = data[data.index < cutoff]
+                frame = IndicatorEngine(self.state_store.emas).compute(data).iloc[-self.state_store.lookback:]
+                rows = frame.rename_axis('Date').reset_index().to_dict('records')
+                bars_before = len(data) - len(frame)
+        if not rows:
+            return None
+        return rows, bars_before
+
+    def screen(self, symbols, as_of=None, years=15):
+        """DataFrame of the symbols that signal in the screened month
+
+        The month is `as_of`'s, or the newest month any symbol has a bar
+        for in its state or the price store; symbols without a bar in it,
+        or that were not index members then, are not candidates. Each row holds Symbol, Date, the bar's
+        indicator row and the rule's report columns.
+        """
+        start = time.perf_counter()
+        windows = {}
+        for symbol in symbols:
+            try:
+                window = self.window(symbol, as_of, years)
+            except Exception as e:
+                print(f"  Error loading indicator state for {symbol}: {e}")
+                continue
+            if window is not None:
+                windows[symbol] = window
+
+        month = _month(as_of) if as_of is not None else max(
+            [_month(rows[-1]['Date']) for rows, _ in windows.values()] + self._stored_months(windows), default=None)
+        if as_of is None:
+            # States that stop before the newest month are advanced from the price store first
+            for symbol in [symbol for symbol, (rows, _) in windows.items() if _month(rows[-1]['Date']) < month]:
+                try:
+                    windows[symbol] = self.window(symbol, None, years, month=month)
+                except Exception as e:
+                    print(f"  Error advancing indicator state for {symbol}: {e}")
+        stale = [symbol for symbol, window in windows.items() if window is None or _month(window[0][-1]['Date']) != month]
+        if stale:
+            print(f"Skipping {len(stale)} symbols without a bar in {month}: {', '.join(stale[:10])}"
+                  f"{' ...' if len(stale) > 10 else ''}")
+        windows = {symbol: window for symbol, window in windows.items() if symbol not in stale}
+        if not windows:
+            print(f"No symbols with a bar in {month}")
+            return pd.DataFrame()
+
+        # Right-align every window so column -1 is each symbol's screened bar
+        width = max(len(rows) for rows, _ in windows.values())
+        data = {}
+        for column in self.rule.plan.columns:
+            values = np.full((len(windows), width), np.nan)
+            for i, (rows, _) in enumerate(windows.values()):
+                values[i, width - len(rows):] = [row[column] for row in rows]
+            data[column] = values
+        bars_before = np.array([bars_before - (width - len(rows)) for rows, bars_before in windows.values()])
+        mask, report = self.rule.evaluate(data, bars_before=bars_before)
+
+        candidates = []
+        screened = list(windows)
+        for i in np.flatnonzero(mask[:, -1]):
+            symbol = screened[i]
+            row = windows[symbol][0][-1]
+            if not self.membership.member_mask(symbol, [row['Date']], interval='1mo')[0]:
+                continue
+            candidates.append({
+                'Symbol': symbol,
+                **row,
+                **{column: values[i, -1] for column, values in report.items()},
+            })
+        print(f"Screened {len(windows)} symbols for {month} with the {self.rule.name} rule "
+              f"in {time.perf_counter() - start:.3f}s: {len(candidates)} candidates")
+        return pd.DataFrame(candidates)
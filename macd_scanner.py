@@ -0,0 +1,148 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import DEFAULT_MACD, IndicatorEngine
+from universe_panel import DEFAULT_PANEL_PATH, UniversePanel
+from universe_registry import MARKET_CAP_LABELS, SIGNALS_METADATA_FILE, get_default_registry
+
+SIGNALS_FILE = 'ha_macd_signals.csv'
+SIGNAL_COLUMNS = ['date', 'symbol', 'marketcapname', 'sector']
+
+# Registry market caps back to the marketcapname labels of the stock/ files
+MARKET_CAP_NAMES = {label: name for name, label in MARKET_CAP_LABELS.items()}
+
+
+class HAMACDScanner:
+    """Monthly Heikin Ashi + MACD scan in the format of stock/Backtest Monthly HA and MACD
+
+    A signal is a month whose HA candle is green (HA_Close > HA_Open) and in
+    which the MACD line crosses above its signal line, once the symbol has
+    enough bars for the slow and signal EMAs to exist. The whole universe is
+    evaluated as [symbols, months] arrays in one pass over a UniversePanel.
+    """
+
+    def __init__(self, fast=DEFAULT_MACD[0], slow=DEFAULT_MACD[1], signal=DEFAULT_MACD[2], registry=None):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.min_bars = slow + signal - 1
+        self.engine = IndicatorEngine(emas={}, macds={'MACD': ('Close', fast, slow, signal)})
+        self.registry = registry or get_default_registry()
+
+    @staticmethod
+    def _previous(values):
+        """Each bar's previous real bar along the last axis (NaN gaps skipped)"""
+        return pd.DataFrame(values.T).ffill().shift(1).to_numpy().T
+
+    def signal_mask(self, columns):
+        """[symbols, months] boolean signal mask from compute_panel() output"""
+        macd, signal_line = columns['MACD'], columns['MACD_Signal']
+        valid = ~np.isnan(macd)
+        bars_seen = np.cumsum(valid, axis=1)
+        with np.errstate(invalid='ignore'):
+            crossed = (macd > signal_line) & (self._previous(macd) <= self._previous(signal_line))
+            green = columns['HA_Close'] > columns['HA_Open']
+        return valid & crossed & green & (bars_seen > self.min_bars)
+
+    def scan_panel(self, panel):
+        """Signals of every symbol in a UniversePanel as a stock/-format DataFrame"""
+        mask = self.signal_mask(self.engine.compute_panel(panel))
+        rows, months = np.nonzero(mask)
+        return self._signals([panel.symbols[i] for i in rows], panel.dates[months])
+
+    def _signals(self, symbols, dates):
+        """stock/-format rows, dated on the first weekday of the signal month"""
+        dates = pd.DatetimeIndex(dates)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        dates = dates.normalize() + pd.offsets.BMonthBegin(0)
+        symbols = [self.registry.resolve(symbol) for symbol in symbols]
+        signals = pd.DataFrame({
+            'date': dates,
+            'symbol': symbols,
+            'marketcapname': [MARKET_CAP_NAMES.get(self.registry.market_cap(s), 'Smallcap') for s in symbols],
+            'sector': [self.registry.sector(s, '') for s in symbols],
+        })
+        signals = signals.sort_values(['date', 'symbol'], kind='stable').reset_index(drop=True)
+        signals['date'] = signals['date'].dt.strftime('%d-%m-%Y')
+        return signals
+
+    def scan_reference(self, frames):
+        """Row-by-row reference of scan_panel() over {symbol: frame}, one bar at a time"""
+        fast_alpha, slow_alpha, signal_alpha = (2.0 / (span + 1) for span in (self.fast, self.slow, self.signal))
+        symbols, dates = [], []
+        for symbol, data in frames.items():
+            data = data.dropna(subset=['Close'])
+            ha_open = ha_close = None
+            fast = slow = signal_line = None
+            prev_macd = prev_signal = None
+            for i, (date, bar) in enumerate(zip(data.index, data.itertuples(index=False))):
+                bar = bar._asdict()
+                ha_open = bar['Open'] if ha_open is None else (ha_open + ha_close) / 2
+                ha_close = (bar['Open'] + bar['High'] + bar['Low'] + bar['Close']) / 4
+
+                close = bar['Close']
+                fast = close if fast is None else (1 - fast_alpha) * fast + fast_alpha * close
+                slow = close if slow is None else (1 - slow_alpha) * slow + slow_alpha * close
+                macd = fast - slow
+                signal_line = macd if signal_line is None else (1 - signal_alpha) * signal_line + signal_alpha * macd
+
+                if (i >= self.min_bars and ha_close > ha_open and
+                        macd > signal_line and prev_macd <= prev_signal):
+                    symbols.append(symbol)
+                    dates.append(date)
+                prev_macd, prev_signal = macd, signal_line
+        return self._signals(symbols, dates)
+
+    def benchmark(self, panel):
+        """Time scan_panel() against scan_reference() on the same panel and compare their signals"""
+        frames = {symbol: panel.symbol_frame(symbol) for symbol in panel.symbols}
+
+        start = time.perf_counter()
+        vectorized = self.scan_panel(panel)
+        vectorized_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = self.scan_reference(frames)
+        reference_seconds = time.perf_counter() - start
+
+        keys = lambda df: set(zip(df['date'], df['symbol']))
+        mismatches = len(keys(vectorized) ^ keys(reference))
+        print(f"HA+MACD scan of {len(panel.symbols)} symbols x {len(panel.dates)} months: "
+              f"vectorized {vectorized_seconds:.3f}s, row loop {reference_seconds:.3f}s "
+              f"({reference_seconds / max(vectorized_seconds, 1e-9):.0f}x), "
+              f"{len(vectorized)} signals, {mismatches} mismatches")
+        return {
+            'vectorized_seconds': vectorized_seconds,
+            'reference_seconds': reference_seconds,
+            'signals': len(vectorized),
+            'mismatches': mismatches,
+        }
+
+    def compare(self, signals, path=SIGNALS_METADATA_FILE):
+        """Overlap of generated signals with an existing stock/ signal file, by (month, symbol)"""
+        reference = pd.read_csv(path)
+        month = lambda df: pd.to_datetime(df['date'], format='%d-%m-%Y').dt.strftime('%Y-%m')
+        ours = set(zip(month(signals), signals['symbol']))
+        theirs = set(zip(month(reference), reference['symbol'].map(self.registry.resolve)))
+        matched = len(ours & theirs)
+        print(f"Matched {matched} of {len(theirs)} signals in {path} ({len(ours) - matched} not in it)")
+        return matched
+
+    def run(self, years=15, output=SIGNALS_FILE, panel_path=DEFAULT_PANEL_PATH):
+        """Scan every registry symbol and write the signals in the stock/ format"""
+        symbols = [self.registry.ticker(symbol) for symbol in sorted(self.registry.entries)]
+        panel = UniversePanel.build(symbols, years=years, path=panel_path)
+        signals = self.scan_panel(panel)
+        signals.to_csv(output, index=False)
+        print(f"Saved {len(signals)} HA+MACD signals to '{output}'")
+        if os.path.exists(SIGNALS_METADATA_FILE):
+            self.compare(signals)
+        return signals
+
+
+if __name__ == "__main__":
+    scanner = HAMACDScanner()
+    scanner.run()
+    scanner.benchmark(UniversePanel.open())
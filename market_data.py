@@ -0,0 +1,220 @@
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Column layout produced by yf.Ticker(...).history; every provider returns it
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# pandas frequency of the bar labels each provider interval produces
+INTERVAL_FREQUENCIES = {
+    '1d': 'B',
+    '1wk': 'W-MON',
+    '1mo': 'MS',
+    '3mo': 'QS',
+}
+
+MARKET_TIMEZONE = 'Asia/Kolkata'
+
+
+class MarketDataProvider:
+    """Source of OHLCV history and index constituents
+
+    `cacheable` tells the PriceStore whether fetched data should be persisted;
+    `rate_limited` whether requests must go through the shared token bucket.
+    """
+
+    name = 'base'
+    cacheable = True
+    rate_limited = False
+
+    def history(self, symbol, start, end, interval='1mo'):
+        """Return OHLCV bars with start <= date < end as a DataFrame indexed by Date"""
+        raise NotImplementedError
+
+    def bulk_history(self, symbols, start, end, interval='1mo'):
+        """Return {symbol: history} for many symbols; providers override this when they can batch"""
+        return {symbol: self.history(symbol, start, end, interval) for symbol in symbols}
+
+    def constituents(self):
+        """Return the list of index constituent symbols (with the .NS suffix)"""
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance"""
+
+    name = 'yahoo'
+    rate_limited = True
+
+    def __init__(self, request_timeout=30):
+        self.request_timeout = request_timeout
+
+    def history(self, symbol, start, end, interval='1mo'):
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        return ticker.history(start=start, end=end, interval=interval, timeout=self.request_timeout)
+
+    @staticmethod
+    def split_download(raw, symbols):
+        """Split a multi-ticker yf.download frame (grouped by ticker) into per-symbol frames"""
+        frames = {}
+        for symbol in symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    frames[symbol] = pd.DataFrame(columns=HISTORY_COLUMNS)
+                    continue
+                data = raw[symbol]
+            else:
+                data = raw
+
+            columns = [col for col in HISTORY_COLUMNS if col in data.columns]
+            data = data[columns].dropna(how='all', subset=['Open', 'High', 'Low', 'Close'])
+            data.index.name = 'Date'
+            frames[symbol] = data
+        return frames
+
+    def bulk_history(self, symbols, start, end, interval='1mo'):
+        """Download all symbols with one yf.download call"""
+        import yfinance as yf
+        raw = yf.download(
+            symbols, start=start, end=end, interval=interval,
+            group_by='ticker', actions=True, auto_adjust=True,
+            ignore_tz=False, threads=True, progress=False, timeout=self.request_timeout
+        )
+        if raw is None or raw.empty:
+            raise ValueError(f"empty response for {len(symbols)} symbols")
+        return self.split_download(raw, symbols)
+
+    def constituents(self):
+        from nifty500_scraper import get_nifty500_list
+        return get_nifty500_list()
+
+
+class ReplayProvider(MarketDataProvider):
+    """Offline provider that replays whatever is already in a local price store
+
+    Missing symbols come back as empty frames; the network is never touched.
+    """
+
+    name = 'replay'
+    cacheable = False
+
+    def __init__(self, root=None):
+        from price_store import DEFAULT_STORE_ROOT, PriceStore
+        self.store = PriceStore(root or DEFAULT_STORE_ROOT, provider=self)
+
+    def history(self, symbol, start, end, interval='1mo'):
+        data = self.store.load(symbol, interval)
+        if data is None or data.empty:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        return self.store._slice(data, start, end).copy()
+
+    def constituents(self):
+        return self.store.cached_symbols('1mo')
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic seeded random-walk OHLCV generator for offline benchmarks and regression runs
+
+    Each symbol gets its own generator seeded from (seed, crc32(symbol)), so a
+    symbol's bars do not depend on which other symbols are requested or in
+    what order. Any symbol name works; constituents() lists `n_symbols`
+    generated names. Bars run for `n_months` up to the month of `anchor`.
+    """
+
+    name = 'synthetic'
+    cacheable = False
+
+    def __init__(self, n_symbols=500, n_months=180, seed=42, anchor=None):
+        self.n_symbols = n_symbols
+        self.n_months = n_months
+        self.seed = seed
+        anchor = pd.Timestamp(anchor) if anchor is not None else pd.Timestamp.now()
+        self.anchor = anchor.tz_localize(None).normalize()
+
+    def _calendar(self, interval):
+        first = (self.anchor - pd.DateOffset(months=self.n_months - 1)).replace(day=1)
+        dates = pd.date_range(first, self.anchor, freq=INTERVAL_FREQUENCIES[interval], tz=MARKET_TIMEZONE)
+        return pd.DatetimeIndex(dates, name='Date')
+
+    def _rng(self, symbol):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode('utf-8'))])
+
+    def generate(self, symbol, interval='1mo'):
+        """Full synthetic history for one symbol
+
+        Only daily bars are simulated; higher timeframes are aggregated from
+        them so every timeframe of a symbol describes the same price path.
+        """
+        if interval != '1d':
+            from resampler import Resampler
+            return Resampler().resample(self.generate(symbol, '1d'), interval)
+
+        dates = self._calendar(interval)
+        n = len(dates)
+        rng = self._rng(symbol)
+
+        # Per-session drift/volatility scaled from monthly figures
+        bars_per_month = n / self.n_months
+        drift = rng.uniform(-0.005, 0.02) / bars_per_month
+        volatility = rng.uniform(0.04, 0.12) / np.sqrt(bars_per_month)
+        start_price = rng.uniform(50, 3000)
+
+        log_returns = rng.normal(drift, volatility, n)
+        close = start_price * np.exp(np.cumsum(log_returns))
+        prev_close = np.concatenate(([start_price], close[:-1]))
+        open_ = prev_close * np.exp(rng.normal(0, volatility / 4, n))
+        high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, volatility / 2, n)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, volatility / 2, n)))
+        volume = np.round(rng.lognormal(14, 1, n))
+
+        return pd.DataFrame({
+            'Open': open_,
+            'High': high,
+            'Low': low,
+            'Close': close,
+            'Volume': volume,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=dates)
+
+    def history(self, symbol, start, end, interval='1mo'):
+        from price_store import PriceStore
+        return PriceStore._slice(self.generate(symbol, interval), start, end)
+
+    def constituents(self):
+        return [f"SYN{i:04d}.NS" for i in range(self.n_symbols)]
+
+
+PROVIDERS = {
+    'yahoo': YahooProvider,
+    'replay': ReplayProvider,
+    'synthetic': SyntheticProvider,
+}
+
+_default_provider = None
+
+
+def get_default_provider():
+    """Return the process-wide provider, chosen by the MARKET_DATA_PROVIDER environment variable
+
+    MARKET_DATA_PROVIDER=replay runs every script from the local price store
+    only; MARKET_DATA_PROVIDER=synthetic runs them on generated data
+    (SYNTHETIC_SYMBOLS, SYNTHETIC_MONTHS and SYNTHETIC_SEED size it).
+    """
+    global _default_provider
+    if _default_provider is None:
+        name = os.environ.get('MARKET_DATA_PROVIDER', 'yahoo').lower()
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown MARKET_DATA_PROVIDER '{name}' (expected one of {sorted(PROVIDERS)})")
+        if name == 'synthetic':
+            _default_provider = SyntheticProvider(
+                n_symbols=int(os.environ.get('SYNTHETIC_SYMBOLS', 500)),
+                n_months=int(os.environ.get('SYNTHETIC_MONTHS', 180)),
+                seed=int(os.environ.get('SYNTHETIC_SEED', 42)),
+            )
+        else:
+            _default_provider = PROVIDERS[name]()
+    return _default_provider
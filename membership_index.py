@@ -0,0 +1,241 @@
+import bisect
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+from price_store import INTERVAL_OFFSETS
+from universe_registry import SIGNALS_METADATA_FILE, get_default_registry
+
+MEMBERSHIP_FILE = 'nifty500_membership.csv'
+
+# Bounds of intervals whose start predates the records or that are still open
+OPEN_START = pd.Timestamp('1900-01-01')
+OPEN_END = pd.Timestamp('2200-01-01')
+
+
+class MembershipIndex:
+    """Point-in-time Nifty 500 membership: per-symbol sorted, non-overlapping [start, end) intervals
+
+    Stored as a versioned CSV of (symbol, start, end), committed with the
+    repo; a blank start means "member since before the records begin", a
+    blank end "still a member". Intervals are kept as parallel sorted
+    start/end lists so a date lookup is one bisect. A symbol with no
+    recorded intervals was never a member, unless the index is not
+    `strict` (synthetic runs, whose generated symbols have no history).
+
+    The file was seeded from the stock/ signal history (seed_from_signals)
+    and grows from there: every successful live constituent fetch records
+    which symbols joined or left the index since the previous one.
+    """
+
+    def __init__(self, path=MEMBERSHIP_FILE, registry=None, strict=True):
+        self.path = path
+        self.registry = registry or get_default_registry()
+        self.strict = strict
+        self.version = None
+        self.updated = None
+        self.starts = {}
+        self.ends = {}
+        self.load()
+
+    @staticmethod
+    def _date(value, default=None):
+        if value is None or (isinstance(value, str) and not value):
+            return default
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return ts.normalize()
+
+    def load(self):
+        self.starts, self.ends = {}, {}
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            header = f.readline()
+            fields = dict(part.split('=', 1) for part in header.lstrip('#').split() if '=' in part)
+            self.version = int(fields.get('version', 0))
+            self.updated = fields.get('updated')
+            for row in csv.DictReader(f):
+                self.add(row['symbol'], row['start'], row['end'])
+
+    def save(self):
+        """Write every interval back atomically, bumping the file version"""
+        if self.path is None:
+            return
+        self.version = (self.version or 0) + 1
+        self.updated = pd.Timestamp.now().strftime('%Y-%m-%d')
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(f"# version={self.version} updated={self.updated}\n")
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['symbol', 'start', 'end'])
+            for symbol in sorted(self.starts):
+                for start, end in zip(self.starts[symbol], self.ends[symbol]):
+                    writer.writerow([
+                        symbol,
+                        '' if start == OPEN_START else start.strftime('%Y-%m-%d'),
+                        '' if end == OPEN_END else end.strftime('%Y-%m-%d'),
+                    ])
+        os.replace(tmp_path, self.path)
+
+    def add(self, symbol, start=None, end=None):
+        """Record membership over [start, end), merging with overlapping or adjacent intervals"""
+        symbol = self.registry.resolve(symbol)
+        start = self._date(start, OPEN_START)
+        end = self._date(end, OPEN_END)
+        starts = self.starts.setdefault(symbol, [])
+        ends = self.ends.setdefault(symbol, [])
+
+        pos = bisect.bisect_left(starts, start)
+        while pos > 0 and ends[pos - 1] >= start:
+            pos -= 1
+            start, end = min(start, starts[pos]), max(end, ends[pos])
+            del starts[pos], ends[pos]
+        while pos < len(starts) and starts[pos] <= end:
+            end = max(end, ends[pos])
+            del starts[pos], ends[pos]
+        starts.insert(pos, start)
+        ends.insert(pos, end)
+
+    def has_history(self, symbol):
+        return self.registry.resolve(symbol) in self.starts
+
+    def is_member(self, symbol, date):
+        """Whether `symbol` was an index member on `date`"""
+        symbol = self.registry.resolve(symbol)
+        if symbol not in self.starts:
+            return not self.strict
+        date = self._date(date)
+        pos = bisect.bisect_right(self.starts[symbol], date) - 1
+        return pos >= 0 and date < self.ends[symbol][pos]
+
+    def was_member_between(self, symbol, start, end):
+        """Whether `symbol` was a member at any time in [start, end)"""
+        symbol = self.registry.resolve(symbol)
+        if symbol not in self.starts:
+            return not self.strict
+        start, end = self._date(start, OPEN_START), self._date(end, OPEN_END)
+        pos = bisect.bisect_left(self.starts[symbol], end) - 1
+        return pos >= 0 and self.ends[symbol][pos] > start
+
+    def filter_members(self, stocks, years=15):
+        """Subset of a {symbol: market cap} dict that was in the index at some point in the last `years`"""
+        end = pd.Timestamp.now().normalize()
+        start = end - pd.Timedelta(days=years * 365)
+        return {symbol: cap for symbol, cap in stocks.items() if self.was_member_between(symbol, start, end)}
+
+    def members_as_of(self, date):
+        """Sorted symbols (without suffix) with a recorded membership covering `date`"""
+        return sorted(symbol for symbol in self.starts if self.is_member(symbol, date))
+
+    def member_mask(self, symbol, dates, interval=None):
+        """Boolean array: was `symbol` a member at each date
+
+        With `interval`, dates are bar labels and membership is taken at the
+        bar's last day, i.e. when its signal would have been acted on.
+        """
+        dates = pd.DatetimeIndex(dates)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        dates = dates.normalize()
+        if interval is not None:
+            dates = dates + INTERVAL_OFFSETS[interval] - pd.Timedelta(days=1)
+
+        symbol = self.registry.resolve(symbol)
+        if symbol not in self.starts:
+            return np.full(len(dates), not self.strict)
+        values = dates.values
+        starts = np.array(self.starts[symbol], dtype='datetime64[ns]')
+        ends = np.array(self.ends[symbol], dtype='datetime64[ns]')
+        pos = np.searchsorted(starts, values, side='right') - 1
+        return (pos >= 0) & (values < ends[np.maximum(pos, 0)])
+
+    def signal_mask(self, signals_df, interval='1mo'):
+        """Boolean array over a signals frame (Stock_Ticker, Date): was the stock a member at that bar"""
+        keep = np.ones(len(signals_df), dtype=bool)
+        dates = pd.to_datetime(signals_df['Date'])
+        for ticker, rows in signals_df.groupby('Stock_Ticker').indices.items():
+            keep[rows] = self.member_mask(ticker, dates.iloc[rows], interval=interval)
+        return keep
+
+    def panel_mask(self, panel):
+        """[symbols, months] membership mask aligned with a UniversePanel"""
+        return np.vstack([self.member_mask(symbol, panel.dates, panel.interval) for symbol in panel.symbols])
+
+    def record_snapshot(self, symbols, as_of=None):
+        """Update intervals from a full constituent list observed on `as_of` (default today)
+
+        New symbols open an interval on `as_of` (membership is never assumed
+        before it was observed); recorded members missing from the list are
+        closed. Returns (joined, left).
+        """
+        as_of = self._date(as_of) if as_of is not None else pd.Timestamp.now().normalize()
+        current = {self.registry.resolve(symbol) for symbol in symbols}
+
+        joined = []
+        for symbol in sorted(current):
+            if symbol not in self.starts or self.ends[symbol][-1] != OPEN_END:
+                self.add(symbol, as_of)
+                joined.append(symbol)
+
+        left = []
+        for symbol in sorted(set(self.starts) - current):
+            if self.ends[symbol][-1] == OPEN_END:
+                self.ends[symbol][-1] = max(as_of, self.starts[symbol][-1])
+                left.append(symbol)
+
+        self.save()
+        return joined, left
+
+    def seed_from_signals(self, path=SIGNALS_METADATA_FILE, current=None):
+        """Rebuild the intervals from a stock/ signal file (date, symbol, ...) of Nifty 500 scans
+
+        A symbol appearing in the scans was a member at least from the month
+        of its first row to the end of the month of its last; members of the
+        `current` list (default: the registry's nifty500 universe, observed
+        on the file's last date) stay open from their first row, or from
+        that date if they never appeared. Returns the number of symbols.
+        """
+        data = pd.read_csv(path)
+        months = pd.to_datetime(data['date'], format='%d-%m-%Y').dt.to_period('M').dt.to_timestamp()
+        symbols = data['symbol'].map(self.registry.resolve)
+        spans = months.groupby(symbols).agg(['min', 'max'])
+        as_of = months.max()
+        if current is None:
+            current = self.registry.universes.get('nifty500', [])
+        current = {self.registry.resolve(symbol) for symbol in current}
+
+        self.starts, self.ends = {}, {}
+        for symbol, (first, last) in spans.iterrows():
+            self.add(symbol, first, OPEN_END if symbol in current else last + pd.DateOffset(months=1))
+        for symbol in sorted(current - set(spans.index)):
+            self.add(symbol, as_of)
+        return len(self.starts)
+
+
+_default_index = None
+
+
+def get_default_membership():
+    """Return the process-wide MembershipIndex, loaded once
+
+    Synthetic runs get an empty, non-strict index that admits every symbol.
+    """
+    global _default_index
+    if _default_index is None:
+        from market_data import get_default_provider
+        if get_default_provider().name == 'synthetic':
+            _default_index = MembershipIndex(path=None, strict=False)
+        else:
+            _default_index = MembershipIndex()
+    return _default_index
+
+
+if __name__ == "__main__":
+    index = MembershipIndex()
+    count = index.seed_from_signals()
+    index.save()
+    print(f"Seeded membership v{index.version} for {count} symbols from {SIGNALS_METADATA_FILE}")
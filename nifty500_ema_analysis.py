@@ -1,14 +1,22 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import requests
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-import time
-from nifty500_scraper import get_nifty500_list, classify_market_cap
+from price_store import get_default_store
+from bulk_loader import BulkLoader
+from universe_registry import get_default_registry
+from membership_index import get_default_membership
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
 
 class StockAnalyzer:
     def __init__(self):
+        self.price_store = get_default_store()
+        self.indicators = IndicatorEngine({'EMA_89': ('HA_Close', 89)}, cache=get_default_cache())
+        self.bulk_loader = BulkLoader(self.price_store)
+        self.registry = get_default_registry()
+        self.membership = get_default_membership()
         self.nifty500_stocks = {}
         self.results = []
         
@@ -16,60 +24,28 @@ class StockAnalyzer:
         """Get Nifty 500 stock list with market cap classification"""
         print("Fetching Nifty 500 stock list...")
         
-        # Get the actual Nifty 500 list
-        stock_symbols = get_nifty500_list()
+        # Get the actual Nifty 500 list from the configured market data provider
+        stock_symbols = self.price_store.provider.constituents()
         
-        # Classify each stock by market cap
-        for symbol in stock_symbols:
-            market_cap = classify_market_cap(symbol)
-            self.nifty500_stocks[symbol] = market_cap
+        # Classify each stock by market cap (renamed tickers collapse to their current symbol)
+        self.nifty500_stocks = self.registry.classify(stock_symbols)
                 
         print(f"Loaded {len(self.nifty500_stocks)} stocks from Nifty 500")
         return self.nifty500_stocks
     
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks"""
-        ha_df = df.copy()
-        
-        # Heikin Ashi Close = (Open + High + Low + Close) / 4
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        
-        # Heikin Ashi Open = (Previous HA Open + Previous HA Close) / 2
-        ha_df['HA_Open'] = 0.0
-        ha_df.loc[0, 'HA_Open'] = df.loc[0, 'Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.loc[i, 'HA_Open'] = (ha_df.loc[i-1, 'HA_Open'] + ha_df.loc[i-1, 'HA_Close']) / 2
-        
-        # Heikin Ashi High = max(High, HA_Open, HA_Close)
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        
-        # Heikin Ashi Low = min(Low, HA_Open, HA_Close)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
-    
     def fetch_stock_data(self, symbol, years=15):
         """Fetch monthly stock data for the specified number of years"""
         try:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=years * 365)
             
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(start=start_date, end=end_date, interval='1mo')
+            data = self.price_store.get_history(symbol, start_date, end_date, interval='1mo')
             
             if data.empty:
                 return None
                 
-            # Calculate Heikin Ashi
-            data = self.calculate_heikin_ashi(data)
-            
-            # Calculate 89 EMA on Heikin Ashi close
-            data['EMA_89'] = self.calculate_ema(data['HA_Close'], 89)
+            # Heikin Ashi and EMAs in one engine pass
+            data = self.indicators.compute(data, symbol)
             
             return data
             
@@ -86,7 +62,8 @@ class StockAnalyzer:
             return
         
         # Find signals where Heikin Ashi close is above 89 EMA
-        signals = data[data['HA_Close'] > data['EMA_89']].copy()
+        members = self.membership.member_mask(symbol, data.index, interval='1mo')
+        signals = data[(data['HA_Close'] > data['EMA_89']) & members].copy()
         
         if not signals.empty:
             for date, row in signals.iterrows():
@@ -105,11 +82,15 @@ class StockAnalyzer:
         
         # Get stock list
         stocks = self.get_nifty500_list()
+        # Skip stocks that were never index members during the scan window
+        stocks = self.membership.filter_members(stocks)
+
+        # Pull every uncached history in multi-ticker chunks before the per-stock loop
+        self.bulk_loader.prefetch(stocks.keys())
         
         # Analyze each stock
         for symbol, market_cap in stocks.items():
             self.analyze_stock(symbol, market_cap)
-            time.sleep(0.1)  # Rate limiting
         
         # Convert results to DataFrame and sort by date
         results_df = pd.DataFrame(self.results)
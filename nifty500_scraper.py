@@ -1,90 +1,179 @@
+import json
+import os
+from datetime import datetime, timedelta
+
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import time
 
-def get_nifty500_list():
-    """Scrape Nifty 500 stock list from NSE website"""
+NSE_HOME_URL = "https://www.nseindia.com/"
+NIFTY500_API_URL = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%20500"
+NIFTY500_INDEX_NAME = "NIFTY 500"
+
+CACHE_DIR = 'price_cache'
+CONSTITUENT_CACHE_FILE = os.path.join(CACHE_DIR, 'nifty500_constituents.json')
+COOKIE_FILE = os.path.join(CACHE_DIR, 'nse_cookies.json')
+# Runtime snapshot of the last live fetch; the committed seed is read until one exists
+SNAPSHOT_FILE = os.path.join(CACHE_DIR, 'nifty500_snapshot.csv')
+SEED_SNAPSHOT_FILE = 'nifty500_snapshot.csv'
+CACHE_TTL_HOURS = 24
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Referer': 'https://www.nseindia.com/market-data/live-equity-market',
+}
+
+_session = None
+
+
+def _get_session():
+    """Reuse one NSE session per process, seeded with cookies persisted by earlier runs"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HEADERS)
+        if os.path.exists(COOKIE_FILE):
+            try:
+                with open(COOKIE_FILE, 'r', encoding='utf-8') as f:
+                    _session.cookies.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+    return _session
+
+
+def _save_cookies(session):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(COOKIE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(session.cookies.get_dict(), f)
+
+
+def _load_cache():
+    if not os.path.exists(CONSTITUENT_CACHE_FILE):
+        return None
+    try:
+        with open(CONSTITUENT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cache(stocks, etag=None, last_modified=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cache = {
+        'stocks': stocks,
+        'fetched_at': datetime.now().isoformat(),
+        'etag': etag,
+        'last_modified': last_modified,
+    }
+    tmp_path = CONSTITUENT_CACHE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, CONSTITUENT_CACHE_FILE)
+    return cache
+
+
+def _touch_cache(cache):
+    """Mark a revalidated cache entry as fresh again"""
+    return _save_cache(cache['stocks'], cache.get('etag'), cache.get('last_modified'))
+
+
+def load_snapshot(snapshot_file=SNAPSHOT_FILE):
+    """Offline constituent snapshot (Symbol column, no .NS suffix), falling back to the committed seed"""
+    if not os.path.exists(snapshot_file):
+        snapshot_file = SEED_SNAPSHOT_FILE
+    if not os.path.exists(snapshot_file):
+        return []
+    return [symbol + '.NS' for symbol in pd.read_csv(snapshot_file)['Symbol'].dropna()]
+
+
+def save_snapshot(stocks, snapshot_file=SNAPSHOT_FILE):
+    """Keep the offline snapshot in step with the last successful live fetch"""
+    os.makedirs(os.path.dirname(snapshot_file) or '.', exist_ok=True)
+    pd.DataFrame({'Symbol': [s.replace('.NS', '') for s in stocks]}).to_csv(snapshot_file, index=False)
+
+
+def _fetch_live(cache):
+    """Request the NIFTY 500 constituents, revalidating the cached copy when possible
+
+    Returns (stocks, response) or (None, response) on a 304 Not Modified.
+    """
+    session = _get_session()
+    headers = {}
+    if cache and cache.get('etag'):
+        headers['If-None-Match'] = cache['etag']
+    if cache and cache.get('last_modified'):
+        headers['If-Modified-Since'] = cache['last_modified']
+
+    response = session.get(NIFTY500_API_URL, headers=headers, timeout=15)
+    if response.status_code in (401, 403):
+        # Cookies missing or expired: visit the homepage once to obtain new ones
+        session.get(NSE_HOME_URL, timeout=15)
+        response = session.get(NIFTY500_API_URL, headers=headers, timeout=15)
+
+    if response.status_code == 304:
+        return None, response
+    response.raise_for_status()
+    _save_cookies(session)
+
+    stocks = []
+    for item in response.json().get('data', []):
+        symbol = item.get('symbol', '')
+        # The first row describes the index itself
+        if symbol and symbol != NIFTY500_INDEX_NAME:
+            stocks.append(symbol + '.NS')
+    if not stocks:
+        raise ValueError("NSE returned an empty constituent list")
+    return stocks, response
+
+
+def _record_membership(stocks):
+    """Log index joins/exits since the previous live fetch in the point-in-time membership index"""
+    try:
+        from membership_index import get_default_membership
+        joined, left = get_default_membership().record_snapshot(stocks)
+        if joined or left:
+            print(f"Index membership changes: {len(joined)} joined, {len(left)} left")
+    except Exception as e:
+        print(f"Could not update membership index: {e}")
+
+
+def get_nifty500_list(ttl_hours=CACHE_TTL_HOURS, force_refresh=False):
+    """Nifty 500 constituents: cached for `ttl_hours`, revalidated against NSE, snapshot as last resort"""
+    cache = _load_cache()
+    if cache and not force_refresh:
+        age = datetime.now() - datetime.fromisoformat(cache['fetched_at'])
+        if age <= timedelta(hours=ttl_hours):
+            print(f"Using cached Nifty 500 list ({len(cache['stocks'])} stocks)")
+            return cache['stocks']
+
     print("Fetching Nifty 500 stock list from NSE...")
-    
     try:
-        # NSE Nifty 500 URL
-        url = "https://www.nseindia.com/market-data/live-equity-market"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        session.headers.update(headers)
-        
-        # Get the main page first to establish session
-        response = session.get("https://www.nseindia.com/")
-        time.sleep(2)
-        
-        # Now get the Nifty 500 data
-        nifty500_url = "https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O"
-        response = session.get(nifty500_url)
-        
-        if response.status_code == 200:
-            data = response.json()
-            stocks = []
-            
-            for item in data.get('data', []):
-                symbol = item.get('symbol', '')
-                if symbol:
-                    stocks.append(symbol + '.NS')
-            
-            print(f"Successfully fetched {len(stocks)} stocks from Nifty 500")
-            return stocks[:500]  # Limit to 500 stocks
-            
+        stocks, response = _fetch_live(cache)
+        if stocks is None:
+            print("Nifty 500 list unchanged since last fetch")
+            return _touch_cache(cache)['stocks']
+
+        _save_cache(stocks, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        save_snapshot(stocks)
+        _record_membership(stocks)
+        print(f"Successfully fetched {len(stocks)} stocks from Nifty 500")
+        return stocks
+
     except Exception as e:
         print(f"Error fetching Nifty 500 list: {e}")
-        print("Using fallback list...")
-        
-        # Fallback list of major Nifty 500 stocks
-        fallback_stocks = [
-            'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HINDUNILVR.NS',
-            'ITC.NS', 'SBIN.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS', 'LT.NS',
-            'HDFC.NS', 'ASIANPAINT.NS', 'AXISBANK.NS', 'MARUTI.NS', 'SUNPHARMA.NS',
-            'ULTRACEMCO.NS', 'WIPRO.NS', 'NESTLEIND.NS', 'TITAN.NS', 'POWERGRID.NS',
-            'NTPC.NS', 'ONGC.NS', 'COALINDIA.NS', 'TECHM.NS', 'BAJFINANCE.NS',
-            'TATAMOTORS.NS', 'JSWSTEEL.NS', 'ADANIPORTS.NS', 'GRASIM.NS', 'CIPLA.NS',
-            'DRREDDY.NS', 'BAJAJFINSV.NS', 'HINDALCO.NS', 'EICHERMOT.NS', 'APOLLOHOSP.NS',
-            'BAJAJ-AUTO.NS', 'BRITANNIA.NS', 'DIVISLAB.NS', 'HEROMOTOCO.NS', 'HINDZINC.NS',
-            'ICICIBANK.NS', 'INDUSINDBK.NS', 'M&M.NS', 'SHREECEM.NS', 'TATASTEEL.NS',
-            'TATACONSUM.NS', 'HCLTECH.NS', 'SBILIFE.NS', 'ADANIGREEN.NS', 'ADANITRANS.NS',
-            'UPL.NS', 'BPCL.NS', 'IOC.NS', 'GAIL.NS', 'VEDL.NS'
-        ]
-        return fallback_stocks
+
+    if cache:
+        print("Using stale cached list...")
+        return cache['stocks']
+
+    print("Using offline snapshot...")
+    return load_snapshot()
 
 def classify_market_cap(symbol):
-    """Classify stocks into Large/Mid/Small cap based on typical market cap ranges"""
-    # This is a simplified classification - in practice you'd use actual market cap data
-    
-    large_cap_symbols = [
-        'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HINDUNILVR.NS',
-        'ITC.NS', 'SBIN.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS', 'LT.NS',
-        'HDFC.NS', 'ASIANPAINT.NS', 'AXISBANK.NS', 'MARUTI.NS', 'SUNPHARMA.NS',
-        'ULTRACEMCO.NS', 'WIPRO.NS', 'NESTLEIND.NS', 'TITAN.NS', 'POWERGRID.NS',
-        'NTPC.NS', 'ONGC.NS', 'COALINDIA.NS', 'TECHM.NS', 'BAJFINANCE.NS',
-        'ICICIBANK.NS', 'INDUSINDBK.NS', 'M&M.NS', 'SHREECEM.NS', 'TATASTEEL.NS',
-        'TATACONSUM.NS', 'HCLTECH.NS', 'SBILIFE.NS', 'BPCL.NS', 'IOC.NS'
-    ]
-    
-    mid_cap_symbols = [
-        'TATAMOTORS.NS', 'JSWSTEEL.NS', 'ADANIPORTS.NS', 'GRASIM.NS', 'CIPLA.NS',
-        'DRREDDY.NS', 'BAJAJFINSV.NS', 'HINDALCO.NS', 'EICHERMOT.NS', 'APOLLOHOSP.NS',
-        'BAJAJ-AUTO.NS', 'BRITANNIA.NS', 'DIVISLAB.NS', 'HEROMOTOCO.NS', 'HINDZINC.NS',
-        'ADANIGREEN.NS', 'ADANITRANS.NS', 'UPL.NS', 'GAIL.NS', 'VEDL.NS'
-    ]
-    
-    if symbol in large_cap_symbols:
-        return 'Large Cap'
-    elif symbol in mid_cap_symbols:
-        return 'Mid Cap'
-    else:
-        return 'Small Cap'
+    """Classify a stock as Large/Mid/Small cap from the universe registry (unknown symbols are Small Cap)"""
+    from universe_registry import get_default_registry
+    return get_default_registry().market_cap(symbol)
 
 if __name__ == "__main__":
     stocks = get_nifty500_list()
@@ -1,5 +1,5 @@
-import pandas as pd
 from datetime import datetime
+from signal_db import get_default_db
 
 class PracticalSignalAnalyzer:
     def __init__(self):
@@ -38,7 +38,7 @@ class PracticalSignalAnalyzer:
         print("=" * 60)
         
         # Read our results
-        results_df = pd.read_csv('corrected_nifty500_signals.csv')
+        results_df = get_default_db().signals_for('corrected_nifty500_signals.csv')
         
         total_signals = len(results_df)
         categorized_signals = 0
@@ -0,0 +1,347 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fetch_executor import get_default_executor, get_default_limiter
+from market_data import get_default_provider
+
+DEFAULT_STORE_ROOT = 'price_cache'
+
+# Length of one bar for each supported interval
+INTERVAL_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '1wk': pd.DateOffset(weeks=1),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+}
+
+
+class PriceStore:
+    """On-disk columnar OHLCV cache: one Parquet file per symbol and interval plus a JSON manifest"""
+
+    def __init__(self, root=DEFAULT_STORE_ROOT, max_age_hours=24, provider=None, derive_from_daily=False):
+        self.root = root
+        self.max_age = timedelta(hours=max_age_hours)
+        self.provider = provider or get_default_provider()
+        # When set, only daily bars are downloaded and higher timeframes are resampled locally
+        self.derive_from_daily = derive_from_daily
+        self._resampler = None
+        self.rate_limiter = get_default_limiter()
+        # Guards the manifest and file writes when fetches run on FetchExecutor threads
+        self.lock = threading.RLock()
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        """Load the manifest describing every cached symbol/interval"""
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  Ignoring unreadable price store manifest: {e}")
+            return {}
+
+    def _save_manifest(self):
+        """Persist the manifest atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _write_frame(data, path):
+        """Write a frame to Parquet via a temporary file so readers never see a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _key(symbol, interval):
+        return f"{interval}/{symbol}"
+
+    def _path(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    @staticmethod
+    def _to_timestamp(value, tz=None):
+        """Convert a date-like value to a Timestamp comparable with an index in `tz`"""
+        ts = pd.Timestamp(value)
+        if tz is not None and ts.tzinfo is None:
+            ts = ts.tz_localize(tz)
+        elif tz is None and ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return ts
+
+    @staticmethod
+    def _slice(data, start, end):
+        """Return rows with start <= index < end (end is exclusive, as in yfinance)"""
+        if data.empty:
+            return data
+        tz = data.index.tz
+        mask = data.index >= PriceStore._to_timestamp(start, tz)
+        if end is not None:
+            mask &= data.index < PriceStore._to_timestamp(end, tz)
+        return data[mask]
+
+    def _covers(self, entry, start, end):
+        """Check whether a manifest entry can answer a request for [start, end)"""
+        if pd.Timestamp(start).tz_localize(None) < pd.Timestamp(entry['start']):
+            return False
+        if end is not None and pd.Timestamp(end).tz_localize(None) <= pd.Timestamp(entry['end']):
+            return True
+        # Open-ended requests ("up to now") are served while the cached pull that
+        # reached the present is younger than max_age
+        updated_at = datetime.fromisoformat(entry['updated_at'])
+        reached_present = pd.Timestamp(entry['end']) >= updated_at - timedelta(minutes=5)
+        return reached_present and datetime.now() - updated_at <= self.max_age
+
+    def has(self, symbol, start, end, interval='1mo'):
+        """Check whether [start, end) can be served without touching the network"""
+        if not self.provider.cacheable:
+            return True
+        entry = self.manifest.get(self._key(symbol, interval))
+        return entry is not None and self._covers(entry, start, end)
+
+    def load(self, symbol, interval='1mo'):
+        """Load the full cached history for a symbol, or None if it is not cached"""
+        entry = self.manifest.get(self._key(symbol, interval))
+        if entry is None:
+            return None
+        if entry['rows'] == 0:
+            return pd.DataFrame()
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def save(self, symbol, interval, data, start, end, meta=None):
+        """Store the history fetched for [start, end) and record it in the manifest
+
+        A window that overlaps or adjoins the cached history is merged into
+        it, so a narrower request never replaces a longer one; on shared
+        bars the window reaching later wins. A window that ends before the
+        cached history starts, or starts after it ends, would leave a gap
+        between the two; it is returned to the caller but not stored, and
+        the cached history stays as it is (refresh() extends it
+        contiguously instead).
+        """
+        with self.lock:
+            start = pd.Timestamp(start).tz_localize(None)
+            end = min(pd.Timestamp(end).tz_localize(None), pd.Timestamp.now())
+            updated_at = datetime.now().isoformat()
+
+            entry = self.manifest.get(self._key(symbol, interval))
+            cached = self.load(symbol, interval) if entry is not None else None
+            if cached is not None and not cached.empty:
+                cached_start, cached_end = pd.Timestamp(entry['start']), pd.Timestamp(entry['end'])
+                if end < cached_start or start > cached_end:
+                    return
+                if end < cached_end:
+                    # The cached tail stays as it was stored, including its refresh time
+                    frames, updated_at = [data, cached], entry['updated_at']
+                else:
+                    frames = [cached, data]
+                frames = [frame for frame in frames if not frame.empty]
+                if frames:
+                    data = pd.concat(frames)
+                    data = data[~data.index.duplicated(keep='last')].sort_index()
+                start, end = min(start, cached_start), max(end, cached_end)
+
+            if not data.empty:
+                self._write_frame(data, self._path(symbol, interval))
+
+            self.manifest[self._key(symbol, interval)] = {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'first_bar': data.index[0].isoformat() if not data.empty else None,
+                'last_bar': data.index[-1].isoformat() if not data.empty else None,
+                'rows': len(data),
+                'updated_at': updated_at,
+                **(meta or {}),
+            }
+            self._save_manifest()
+
+    def fetch(self, symbol, start, end, interval='1mo'):
+        """Request history from the market data provider, under the shared rate limiter if it needs one"""
+        if self.provider.rate_limited:
+            self.rate_limiter.acquire()
+        return self.provider.history(symbol, start, end, interval)
+
+    def _refresh_start(self, entry, interval):
+        """First bar date that has to be re-requested to bring an entry up to date
+
+        A last bar whose period was still open when it was stored is requested
+        again so the in-progress candle gets replaced by its final values.
+        """
+        last_bar = pd.Timestamp(entry['last_bar']).tz_localize(None)
+        period_end = last_bar + INTERVAL_OFFSETS[interval]
+        if pd.Timestamp(entry['updated_at']) < period_end:
+            return last_bar
+        return period_end
+
+    @staticmethod
+    def _rebased(cached, new_data, check_bar):
+        """Whether freshly fetched bars are on a different price basis than the cached ones
+
+        Yahoo back-adjusts whole histories for splits and dividends, so the
+        re-requested `check_bar` (a completed bar, or None) closing at a
+        different price, or a split or dividend the cached bars do not
+        already carry, means the stored bars no longer line up with new ones.
+        """
+        if check_bar is not None:
+            check_bar = PriceStore._to_timestamp(check_bar, cached.index.tz)
+            if check_bar not in new_data.index:
+                return True
+            if not np.isclose(new_data.at[check_bar, 'Close'], cached.at[check_bar, 'Close'], rtol=1e-6, atol=0):
+                return True
+        for column in ('Stock Splits', 'Dividends'):
+            if column not in new_data.columns:
+                continue
+            events = new_data[column].fillna(0)
+            known = cached[column].reindex(events.index).fillna(0) if column in cached.columns else 0
+            if ((events != 0) & (events != known)).any():
+                return True
+        return False
+
+    def refresh(self, symbol, interval='1mo'):
+        """Incrementally bring a cached symbol up to date, fetching only the missing range
+
+        The last completed stored bar is always requested again. When the
+        history has been re-based since (see _rebased), the whole cached
+        range is pulled again and rewritten instead of appended to.
+
+        Returns the full updated history, or None when the symbol has no cached
+        bars (callers then fall back to a full pull).
+        """
+        entry = self.manifest.get(self._key(symbol, interval))
+        if entry is None or not entry['rows'] or interval not in INTERVAL_OFFSETS:
+            return None
+        cached = self.load(symbol, interval)
+        if cached is None:
+            return None
+
+        now = datetime.now()
+        refresh_start = self._refresh_start(entry, interval)
+        if refresh_start > pd.Timestamp(now):
+            with self.lock:
+                entry['updated_at'] = now.isoformat()
+                entry['end'] = pd.Timestamp(now).isoformat()
+                self._save_manifest()
+            return cached
+
+        # Overlap by one completed bar (the one before an in-progress last bar) to detect re-basing
+        last_bar = pd.Timestamp(entry['last_bar']).tz_localize(None)
+        if refresh_start > last_bar:
+            check_bar = last_bar
+        else:
+            check_bar = self._to_timestamp(cached.index[-2]) if len(cached) > 1 else None
+        fetch_start = check_bar if check_bar is not None else refresh_start
+        new_data = self.fetch(symbol, fetch_start.to_pydatetime(), now, interval)
+
+        if not new_data.empty and self._rebased(cached, new_data, check_bar):
+            print(f"  {symbol}: prices re-based by a split or dividend, re-pulling its full history")
+            full = self.fetch(symbol, pd.Timestamp(entry['start']).to_pydatetime(), now, interval)
+            with self.lock:
+                if not full.empty:
+                    cached = full
+                    self._write_frame(cached, self._path(symbol, interval))
+                entry.update({
+                    'end': pd.Timestamp(now).isoformat(),
+                    'first_bar': cached.index[0].isoformat(),
+                    'last_bar': cached.index[-1].isoformat(),
+                    'rows': len(cached),
+                    'updated_at': now.isoformat(),
+                })
+                self._save_manifest()
+            return cached
+
+        with self.lock:
+            if not new_data.empty:
+                # Replace the stored tail from the first refreshed bar onwards
+                first_new = self._to_timestamp(new_data.index[0], cached.index.tz)
+                cached = pd.concat([cached[cached.index < first_new], new_data])
+                cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+                self._write_frame(cached, self._path(symbol, interval))
+
+            entry.update({
+                'end': pd.Timestamp(now).isoformat(),
+                'last_bar': cached.index[-1].isoformat(),
+                'rows': len(cached),
+                'updated_at': now.isoformat(),
+            })
+            self._save_manifest()
+        return cached
+
+    def cached_symbols(self, interval='1mo'):
+        """List every symbol with an entry for `interval`"""
+        prefix = f"{interval}/"
+        return sorted(key[len(prefix):] for key in self.manifest if key.startswith(prefix))
+
+    def refresh_all(self, symbols=None, interval='1mo', executor=None):
+        """Incrementally refresh `symbols` (default: everything cached for `interval`) concurrently"""
+        if symbols is None:
+            symbols = self.cached_symbols(interval)
+        executor = executor or get_default_executor()
+        results = executor.map(lambda symbol: self.refresh(symbol, interval), symbols, label='refresh')
+        refreshed = sum(1 for data in results.values() if data is not None)
+        print(f"Refreshed {refreshed}/{len(symbols)} cached symbols ({interval})")
+        return refreshed
+
+    def get_history(self, symbol, start, end, interval='1mo'):
+        """Return OHLCV history for [start, end), reading the local store first"""
+        if self.derive_from_daily and interval != '1d':
+            if self._resampler is None:
+                from resampler import Resampler
+                self._resampler = Resampler(self)
+            return self._resampler.get_history(symbol, start, end, timeframe=interval)
+
+        if not self.provider.cacheable:
+            # Offline providers (replay, synthetic) are served directly and never persisted
+            return self.provider.history(symbol, start, end, interval)
+
+        entry = self.manifest.get(self._key(symbol, interval))
+        if self.has(symbol, start, end, interval):
+            data = self.load(symbol, interval)
+            if data is not None:
+                return self._slice(data, start, end).copy()
+
+        # Stale but otherwise covering entries only need their newest bars
+        if entry is not None and pd.Timestamp(start).tz_localize(None) >= pd.Timestamp(entry['start']):
+            data = self.refresh(symbol, interval)
+            if data is not None:
+                return self._slice(data, start, end).copy()
+
+        fetch_end = end if end is not None else datetime.now()
+        data = self.fetch(symbol, start, fetch_end, interval)
+        self.save(symbol, interval, data, start, fetch_end)
+        return data
+
+
+_default_store = None
+
+
+def get_default_store():
+    """Return the process-wide PriceStore shared by all analyzers
+
+    DERIVE_FROM_DAILY=1 makes every script download daily bars once and
+    build its monthly candles locally.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore(derive_from_daily=os.environ.get('DERIVE_FROM_DAILY') == '1')
+    return _default_store
+
+
+if __name__ == "__main__":
+    # Monthly production refresh: one small request per cached symbol
+    get_default_store().refresh_all(interval='1mo')
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from market_data import HISTORY_COLUMNS
+
+# Bar labels match Yahoo Finance: weeks start on Monday, months/quarters on the 1st
+TIMEFRAME_RULES = {
+    '1wk': 'W-MON',
+    '1mo': 'MS',
+    '3mo': 'QS',
+}
+
+# Period aliases whose start_time equals the bar label above
+PERIOD_ALIASES = {
+    '1wk': 'W-SUN',
+    '1mo': 'M',
+    '3mo': 'Q',
+}
+
+DEFAULT_HOLIDAYS_FILE = 'nse_holidays.csv'
+
+
+class NSECalendar:
+    """NSE trading-day filter: weekdays minus exchange holidays
+
+    Holidays are read from an optional CSV with a `date` column. Yahoo
+    sometimes emits filler rows for closed days (zero volume, flat bar);
+    those are dropped as well so they never become a period's open or close.
+    """
+
+    def __init__(self, holidays_file=DEFAULT_HOLIDAYS_FILE):
+        self.holidays = pd.DatetimeIndex([])
+        if holidays_file and os.path.exists(holidays_file):
+            self.holidays = pd.DatetimeIndex(pd.to_datetime(pd.read_csv(holidays_file)['date'])).normalize()
+
+    def trading_days(self, daily):
+        """Rows of `daily` that are NSE trading sessions"""
+        if daily.empty:
+            return daily
+        dates = daily.index.tz_localize(None) if daily.index.tz is not None else daily.index
+        dates = dates.normalize()
+        is_session = (dates.dayofweek < 5) & ~dates.isin(self.holidays)
+        if 'Volume' in daily.columns:
+            filler = (daily['Volume'].to_numpy() == 0) & (daily['High'].to_numpy() == daily['Low'].to_numpy())
+            is_session &= ~filler
+        return daily[is_session]
+
+
+class Resampler:
+    """Derive weekly/monthly/quarterly candles from cached daily bars
+
+    Only daily bars are ever downloaded; each higher timeframe is built
+    locally and cached in the price store under '<timeframe>_from_1d',
+    tagged with the daily bars it was built from so it is rebuilt only when
+    those change.
+    """
+
+    def __init__(self, price_store=None, calendar=None):
+        self.price_store = price_store
+        self.calendar = calendar or NSECalendar()
+
+    def resample(self, daily, timeframe):
+        """Aggregate daily OHLCV to `timeframe` candles on NSE sessions"""
+        daily = self.calendar.trading_days(daily)
+        if daily.empty:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+        grouped = daily.resample(TIMEFRAME_RULES[timeframe], label='left', closed='left')
+        bars = grouped.agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+        if 'Dividends' in daily.columns:
+            bars['Dividends'] = grouped['Dividends'].sum()
+        if 'Stock Splits' in daily.columns:
+            # Split ratios compound within a period; 0 means "no split" as in Yahoo data
+            splits = daily['Stock Splits'].replace(0, np.nan)
+            bars['Stock Splits'] = splits.resample(TIMEFRAME_RULES[timeframe], label='left', closed='left').prod(min_count=1).fillna(0.0)
+
+        # Periods without a single session (e.g. a holiday-only week) produce no bar
+        bars = bars.dropna(subset=['Open', 'Close'])
+        bars.index.name = 'Date'
+        return bars
+
+    def period_paths(self, daily, timeframe='1mo'):
+        """Daily sessions tagged with the `timeframe` bar they belong to (column 'Period')
+
+        This is the intra-period price path behind each candle, used for
+        realistic fills inside the month rather than at the monthly close.
+        """
+        daily = self.calendar.trading_days(daily).copy()
+        dates = daily.index.tz_localize(None) if daily.index.tz is not None else daily.index
+        periods = dates.to_period(PERIOD_ALIASES[timeframe]).start_time
+        if daily.index.tz is not None:
+            periods = periods.tz_localize(daily.index.tz)
+        daily['Period'] = periods
+        return daily
+
+    @staticmethod
+    def breakout_fill(path, level):
+        """First session in a daily path whose High exceeds `level`, filled at max(Open, level)
+
+        Returns (date, price), or (None, None) if the level is never crossed.
+        """
+        crossed = np.flatnonzero(path['High'].to_numpy() > level)
+        if len(crossed) == 0:
+            return None, None
+        session = path.iloc[crossed[0]]
+        return path.index[crossed[0]], max(session['Open'], level)
+
+    def get_history(self, symbol, start, end, timeframe='1mo'):
+        """Return `timeframe` candles for [start, end) derived from the symbol's daily bars"""
+        daily = self.price_store.get_history(symbol, start, end, interval='1d')
+        if timeframe == '1d':
+            return daily
+
+        source = daily
+        if self.price_store.provider.cacheable:
+            source = self.price_store.load(symbol, '1d')
+            if source is None:
+                source = daily
+
+        derived_interval = f"{timeframe}_from_1d"
+        signature = {
+            'source_rows': len(source),
+            'source_last_bar': source.index[-1].isoformat() if not source.empty else None,
+        }
+
+        bars = None
+        if self.price_store.provider.cacheable:
+            entry = self.price_store.manifest.get(self.price_store._key(symbol, derived_interval))
+            if entry is not None and all(entry.get(k) == v for k, v in signature.items()):
+                bars = self.price_store.load(symbol, derived_interval)
+
+        if bars is None:
+            bars = self.resample(source, timeframe)
+            if self.price_store.provider.cacheable and not source.empty:
+                self.price_store.save(symbol, derived_interval, bars, source.index[0], source.index[-1], meta=signature)
+
+        return self.price_store._slice(bars, start, end).copy()
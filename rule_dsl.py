@@ -0,0 +1,308 @@
+import ast
+import io
+import tokenize
+
+import numpy as np
+
+# Rule variables that name a frame column directly
+COLUMN_VARIABLES = {
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume',
+    'ha_open': 'HA_Open', 'ha_high': 'HA_High', 'ha_low': 'HA_Low', 'ha_close': 'HA_Close',
+    'ha_body': 'HA_Body', 'ha_upper_shadow': 'HA_UpperShadow', 'ha_lower_shadow': 'HA_LowerShadow',
+    'ha_range': 'HA_TotalRange', 'is_red_doji': 'Is_Red_Doji',
+}
+
+# `&`, `|` and `~` bind looser than comparisons in rules (unlike in Python)
+LOGICAL_TOKENS = {'&': 'and', '|': 'or', '~': 'not'}
+
+BINARY_OPS = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div'}
+COMPARE_OPS = {ast.Gt: 'gt', ast.GtE: 'ge', ast.Lt: 'lt', ast.LtE: 'le', ast.Eq: 'eq', ast.NotEq: 'ne'}
+COMPARE_SYMBOLS = {'gt': '>', 'ge': '>=', 'lt': '<', 'le': '<=', 'eq': '==', 'ne': '!='}
+COMMUTATIVE = {'add', 'mul', 'eq', 'ne', 'and', 'or'}
+
+OPERATIONS = {
+    'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': np.divide,
+    'gt': np.greater, 'ge': np.greater_equal, 'lt': np.less, 'le': np.less_equal,
+    'eq': np.equal, 'ne': np.not_equal, 'and': np.logical_and, 'or': np.logical_or,
+    'neg': np.negative, 'not': np.logical_not,
+}
+
+
+def _shift(values, periods):
+    """Values `periods` bars earlier along the last axis; the first bars get NaN"""
+    if periods == 0:
+        return values
+    shifted = np.full(values.shape, np.nan)
+    shifted[..., periods:] = values[..., :values.shape[-1] - periods]
+    return shifted
+
+
+def _python_syntax(expression):
+    """The rule with & | ~ spelled and/or/not, so they bind looser than comparisons"""
+    lines = expression.splitlines(keepends=True)
+    offsets = np.cumsum([0] + [len(line) for line in lines])
+    tokens = tokenize.generate_tokens(io.StringIO(expression).readline)
+    replacements = [(offsets[t.start[0] - 1] + t.start[1], LOGICAL_TOKENS[t.string])
+                    for t in tokens if t.type == tokenize.OP and t.string in LOGICAL_TOKENS]
+    for position, word in reversed(replacements):
+        expression = f"{expression[:position]} {word} {expression[position + 1:]}"
+    return expression
+
+
+def _parse(expression):
+    try:
+        return ast.parse(_python_syntax(expression).strip(), mode='eval').body
+    except (SyntaxError, tokenize.TokenError) as e:
+        raise ValueError(f"Cannot parse rule '{expression}': {e}")
+
+
+class RulePlan:
+    """Flat list of array operations with every repeated subexpression computed once
+
+    Each step is (operation, arguments); arguments are earlier step numbers,
+    except for 'column' ((column name, bars back)) and 'const' ((value,)).
+    """
+
+    def __init__(self):
+        self.steps = []
+        self._slots = {}
+
+    def add(self, operation, *arguments):
+        """Step number of an operation, reusing an identical earlier step"""
+        if operation in COMMUTATIVE:
+            arguments = tuple(sorted(arguments))
+        key = (operation,) + arguments
+        if key not in self._slots:
+            self._slots[key] = len(self.steps)
+            self.steps.append(key)
+        return self._slots[key]
+
+    @property
+    def columns(self):
+        """Frame columns the plan reads"""
+        return sorted({step[1] for step in self.steps if step[0] == 'column'})
+
+    @property
+    def lookback(self):
+        """Largest number of bars back any step reads"""
+        return max((step[2] for step in self.steps if step[0] == 'column'), default=0)
+
+    def run(self, data):
+        """Value of every step; `data` is anything indexable by column name"""
+        loaded = {name: np.asarray(data[name], dtype='float64') for name in self.columns}
+        values = []
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for operation, *arguments in self.steps:
+                if operation == 'column':
+                    values.append(_shift(loaded[arguments[0]], arguments[1]))
+                elif operation == 'const':
+                    values.append(np.float64(arguments[0]))
+                else:
+                    values.append(OPERATIONS[operation](*(values[i] for i in arguments)))
+        return values
+
+
+class SignalRule:
+    """A signal condition written as an expression over named per-bar series
+
+    `expression` combines variables with + - * /, comparisons and & | ~, and
+    `x.shift(n)` reads x n bars earlier. Variables are the COLUMN_VARIABLES,
+    the keys of `emas` (variable -> (source column, span), computed by the
+    IndicatorEngine as EMA_<span>_<source>) and the keys of `defines`
+    (variable -> expression). `report` maps output columns to expressions
+    whose values are returned at each signal. Everything is compiled into
+    one RulePlan, so a subexpression shared by the condition, the defines
+    and the report is evaluated once per call. Signals start at bar `start`,
+    by default the rule's lookback (the furthest shift it reads).
+    """
+
+    def __init__(self, expression, emas=None, defines=None, report=None, start=None, name=None, description=None):
+        self.name = name
+        self.expression = expression
+        self.description = list(description or [])
+        self.variables = dict(COLUMN_VARIABLES)
+        self.emas = {}
+        for variable, (source, span) in (emas or {}).items():
+            column = f"EMA_{span}_{source}"
+            self.variables[variable] = column
+            self.emas[column] = (source, span)
+        self.defines = {variable: _parse(text) for variable, text in (defines or {}).items()}
+
+        self.plan = RulePlan()
+        tree = _parse(expression)
+        self.mask_slot = self._compile(tree, 0, ())
+        conjuncts = tree.values if isinstance(tree, ast.BoolOp) and isinstance(tree.op, ast.And) else [tree]
+        self.conditions = [(ast.unparse(node), self._compile(node, 0, ()), self._operands(node)) for node in conjuncts]
+        self.report = {column: self._compile(_parse(text), 0, ()) for column, text in (report or {}).items()}
+        self.start = self.plan.lookback if start is None else start
+
+    @property
+    def lookback(self):
+        return self.plan.lookback
+
+    @classmethod
+    def from_config(cls, name, config):
+        return cls(name=name, **config)
+
+    def _operands(self, node):
+        """Step numbers of a single comparison's two sides, for explain()"""
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            return self._compile(node.left, 0, ()), self._compile(node.comparators[0], 0, ())
+        return None
+
+    def _compile(self, node, offset, expanding):
+        """Step number of `node` read `offset` bars back; shifts are pushed down onto the columns"""
+        plan = self.plan
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return plan.add('const', float(node.value))
+        if isinstance(node, ast.Name):
+            if node.id in self.defines:
+                if node.id in expanding:
+                    raise ValueError(f"Rule variable '{node.id}' is defined in terms of itself")
+                return self._compile(self.defines[node.id], offset, expanding + (node.id,))
+            if node.id not in self.variables:
+                raise ValueError(f"Unknown rule variable '{node.id}'")
+            return plan.add('column', self.variables[node.id], offset)
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'shift'
+                and not node.keywords and len(node.args) == 1 and isinstance(node.args[0], ast.Constant)
+                and type(node.args[0].value) is int and node.args[0].value >= 0):
+            return self._compile(node.func.value, offset + node.args[0].value, expanding)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not)):
+            operation = 'neg' if isinstance(node.op, ast.USub) else 'not'
+            return plan.add(operation, self._compile(node.operand, offset, expanding))
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            return plan.add(BINARY_OPS[type(node.op)],
+                            self._compile(node.left, offset, expanding), self._compile(node.right, offset, expanding))
+        if isinstance(node, ast.BoolOp):
+            operation = 'and' if isinstance(node.op, ast.And) else 'or'
+            slots = [self._compile(value, offset, expanding) for value in node.values]
+            result = slots[0]
+            for slot in slots[1:]:
+                result = plan.add(operation, result, slot)
+            return result
+        if isinstance(node, ast.Compare) and all(type(op) in COMPARE_OPS for op in node.ops):
+            sides = [self._compile(side, offset, expanding) for side in [node.left] + node.comparators]
+            result = None
+            for op, left, right in zip(node.ops, sides, sides[1:]):
+                comparison = plan.add(COMPARE_OPS[type(op)], left, right)
+                result = comparison if result is None else plan.add('and', result, comparison)
+            return result
+        raise ValueError(f"Unsupported rule syntax: {ast.unparse(node)}")
+
+    def evaluate(self, data, bars_before=0):
+        """(signal mask, {report column: array}) over every bar of `data`
+
+        Works along the last axis, so `data` can hold one symbol's [bars]
+        columns (a DataFrame or CompactFrame) or [symbols, bars] arrays.
+        `bars_before` (scalar or one per row) is how many bars of history
+        precede the first column, for windows of recent bars; `start` counts
+        from the true first bar.
+        """
+        values = self.plan.run(data)
+        shape = np.shape(data[self.plan.columns[0]])
+        mask = np.broadcast_to(values[self.mask_slot], shape).copy()
+        mask &= np.asarray(bars_before)[..., None] + np.arange(shape[-1]) >= self.start
+        return mask, {column: np.broadcast_to(values[slot], shape) for column, slot in self.report.items()}
+
+    def signals(self, data, members=None):
+        """(signal indices, {report column: values at each}) for one symbol's frame
+
+        With `members`, bars where the stock was not an index member are dropped.
+        """
+        mask, report = self.evaluate(data)
+        if members is not None:
+            mask &= members
+        indices = np.flatnonzero(mask)
+        return indices, {column: values[indices] for column, values in report.items()}
+
+    def explain(self, data, indices):
+        """For each bar in `indices`, one line per top-level condition with its operands' values"""
+        values = self.plan.run(data)
+        shape = np.shape(data[self.plan.columns[0]])
+        at = lambda slot, index: np.broadcast_to(values[slot], shape)[..., index]
+        explanations = []
+        for index in indices:
+            lines = []
+            for text, slot, operands in self.conditions:
+                if operands is None:
+                    lines.append(f"{text}: {bool(at(slot, index))}")
+                    continue
+                symbol = COMPARE_SYMBOLS[self.plan.steps[slot][0]]
+                lines.append(f"{text} ({at(operands[0], index):.2f} {symbol} {at(operands[1], index):.2f}): "
+                             f"{bool(at(slot, index))}")
+            explanations.append(lines)
+        return explanations
+
+
+def breakout_config(ema_span=89, confirm_months=2, min_strength=1):
+    """Config of the sustained monthly breakout rule; the defaults are RULES['improved']
+
+    HA candle crossing above EMA(HA_Close, ema_span) after `confirm_months`
+    closes at or below it, clearing it by at least `min_strength` percent.
+    The grid search sweeps these parameters.
+    """
+    ema = f"ema{ema_span}"
+    confirmations = [f"ha_close.shift({k}) {'<' if k == 1 else '<='} {ema}.shift({k})"
+                     for k in range(1, confirm_months + 1)]
+    descriptions = [f"1 month ago HA-Close < Monthly EMA(Monthly HA_Close, {ema_span})"]
+    descriptions += [f"{k} months ago HA-Close <= Monthly EMA" + (' (FIRST CROSSOVER VALIDATION)' if k == confirm_months else '')
+                     for k in range(2, confirm_months + 1)]
+    return {
+        'expression': ' & '.join([f'ha_close > ha_open & ha_close > {ema} & ha_open <= {ema} '
+                                  f'& close.shift({ema_span}) > 0', *confirmations, f'strength >= {min_strength:g}']),
+        'emas': {ema: ('HA_Close', ema_span)},
+        'defines': {'strength': f'(ha_close - {ema}) / {ema} * 100'},
+        'report': {'HA_Close': 'ha_close', 'HA_Open': 'ha_open', f'EMA_{ema_span}_HA_Close': ema,
+                   'Breakout_Strength_Percent': 'strength', 'Regular_Close': 'close'},
+        'start': ema_span + confirm_months + 1,
+        'description': [
+            'Monthly HA-Close > Monthly HA-Open',
+            f'Monthly HA-Close > Monthly EMA(Monthly HA_Close, {ema_span})',
+            f'Monthly HA-Open <= Monthly EMA(Monthly HA_Close, {ema_span})',
+            f'{ema_span} months ago Close > 0',
+            *descriptions,
+            f'Breakout strength >= {min_strength:g}% above EMA (QUALITY FILTER)',
+        ],
+    }
+
+
+# The monthly analyzer variants as rule configs. `start` keeps each script's
+# original first evaluated month, one to three bars later than the lookback.
+RULES = {
+    'refined': {
+        'expression': 'ha_close > ha_open & ha_close > ema89 & ha_open <= ema89 & close.shift(89) > 0 '
+                      '& ha_close.shift(1) < ema89.shift(1)',
+        'emas': {'ema89': ('Close', 89)},
+        'report': {'HA_Close': 'ha_close', 'HA_Open': 'ha_open', 'EMA_89_Close': 'ema89', 'Regular_Close': 'close'},
+        'start': 90,
+        'description': [
+            'Monthly HA-Close > Monthly HA-Open',
+            'Monthly HA-Close > Monthly EMA(Monthly Close, 89)',
+            'Monthly HA-Open <= Monthly EMA(Monthly Close, 89)',
+            '89 months ago Close > 0',
+            '1 month ago HA-Close < Monthly EMA(Monthly Close, 89)',
+        ],
+    },
+    'corrected': {
+        'expression': 'ha_close > ha_open & ha_close > ema89 & ha_open <= ema89 & close.shift(89) > 0 '
+                      '& ha_close.shift(1) < ema89.shift(1)',
+        'emas': {'ema89': ('HA_Close', 89)},
+        'report': {'HA_Close': 'ha_close', 'HA_Open': 'ha_open', 'EMA_89_HA_Close': 'ema89', 'Regular_Close': 'close'},
+        'start': 90,
+        'description': [
+            'Monthly HA-Close > Monthly HA-Open',
+            'Monthly HA-Close > Monthly EMA(Monthly HA_Close, 89)',
+            'Monthly HA-Open <= Monthly EMA(Monthly HA_Close, 89)',
+            '89 months ago Close > 0',
+            '1 month ago HA-Close < Monthly EMA(Monthly HA_Close, 89)',
+        ],
+    },
+    'improved': breakout_config(),
+}
+
+
+def get_rule(name, rules=RULES):
+    """Compiled SignalRule for a named config"""
+    if name not in rules:
+        raise KeyError(f"Unknown signal rule '{name}' (expected one of {sorted(rules)})")
+    return SignalRule.from_config(name, rules[name])
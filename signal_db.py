@@ -0,0 +1,276 @@
+import glob
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from universe_registry import MARKET_CAP_LABELS, SIGNALS_METADATA_FILE
+
+DEFAULT_DB_PATH = 'signals.db'
+
+# CSV column -> signals table column; anything else goes to the `extra` JSON column
+SIGNAL_COLUMNS = {
+    'Date': 'date', 'Stock_Ticker': 'symbol', 'Market_Cap': 'market_cap', 'Sector': 'sector',
+    'HA_Close': 'ha_close', 'HA_Open': 'ha_open',
+    'EMA_89_HA_Close': 'ema_89_ha_close', 'EMA_89_Close': 'ema_89_close', 'EMA_89': 'ema_89',
+    'Breakout_Strength_Percent': 'breakout_strength_percent',
+    'Signal_High': 'signal_high', 'Signal_Close': 'signal_close', 'Regular_Close': 'regular_close',
+}
+TRADE_COLUMNS = ['symbol', 'signal_date', 'status', 'entry_price', 'entry_date', 'exit_price', 'exit_date',
+                 'exit_reason', 'return_percent', 'months_held', 'signal_high']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    source TEXT,
+    source_mtime REAL,
+    columns TEXT NOT NULL,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    market_cap TEXT,
+    sector TEXT,
+    ha_close REAL, ha_open REAL, ema_89_ha_close REAL, ema_89_close REAL, ema_89 REAL,
+    breakout_strength_percent REAL, signal_high REAL, signal_close REAL, regular_close REAL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    signal_date TEXT NOT NULL,
+    status TEXT,
+    entry_price REAL, entry_date TEXT, exit_price REAL, exit_date TEXT, exit_reason TEXT,
+    return_percent REAL, months_held INTEGER, signal_high REAL
+);
+CREATE INDEX IF NOT EXISTS runs_name ON runs(name, run_id);
+CREATE INDEX IF NOT EXISTS runs_source ON runs(source, run_id);
+CREATE INDEX IF NOT EXISTS signals_run ON signals(run_id, date);
+CREATE INDEX IF NOT EXISTS signals_symbol_date ON signals(symbol, date);
+CREATE INDEX IF NOT EXISTS signals_market_cap ON signals(market_cap);
+CREATE INDEX IF NOT EXISTS signals_sector ON signals(sector);
+CREATE INDEX IF NOT EXISTS trades_run ON trades(run_id);
+CREATE INDEX IF NOT EXISTS trades_symbol_date ON trades(symbol, signal_date);
+"""
+
+
+def _stock_format(data):
+    """stock/-format signals (date dd-mm-yyyy, symbol, marketcapname, sector) in the analyzers' columns"""
+    return pd.DataFrame({
+        'Date': pd.to_datetime(data['date'], format='%d-%m-%Y').dt.strftime('%Y-%m-%d'),
+        'Stock_Ticker': data['symbol'],
+        'Market_Cap': data['marketcapname'].map(MARKET_CAP_LABELS).fillna(data['marketcapname']),
+        'Sector': data['sector'],
+    })
+
+
+def _records(data):
+    """DataFrame rows as tuples of plain Python values, NaN as None, for executemany"""
+    return list(data.astype(object).where(data.notna(), None).itertuples(index=False, name=None))
+
+
+class SignalDatabase:
+    """Embedded SQLite store of scan runs, their signals and backtest trades
+
+    Every analyzer CSV (and the stock/ signal files) maps onto one schema:
+    a run row per scan or backtest, and its signals or trades, indexed on
+    (symbol, date), market cap, sector and run, so reports and validation
+    query what they need instead of re-parsing whole CSVs. A run remembers
+    its CSV's columns, so signals() returns the table exactly as the CSV
+    had it. Scripts record their output as they save it; signals_for()
+    serves a CSV's rows from the database, importing the file first if it
+    changed on disk since it was recorded.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _source(path):
+        return (os.path.normpath(path), os.path.getmtime(path)) if path and os.path.exists(path) else (path, None)
+
+    def _create_run(self, name, kind, columns, source=None, params=None):
+        source, mtime = self._source(source)
+        cursor = self.connection.execute(
+            'INSERT INTO runs (name, kind, created_at, source, source_mtime, columns, params) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (name, kind, datetime.now().isoformat(timespec='seconds'), source, mtime, json.dumps(list(columns)),
+             json.dumps(params, default=str) if params is not None else None),
+        )
+        return cursor.lastrowid
+
+    def record_signals(self, data, name, source=None, params=None):
+        """Store a signals table (analyzer CSV columns) as a new run in one transaction; returns its run_id
+
+        Pass `source` after writing the CSV so signals_for() can serve that file.
+        """
+        if {'date', 'symbol', 'marketcapname'} <= set(data.columns):
+            data = _stock_format(data)
+        table_columns = list(SIGNAL_COLUMNS.values())
+        with self.connection:
+            run_id = self._create_run(name, 'signals', data.columns, source, params)
+            rows = data.rename(columns=SIGNAL_COLUMNS).reindex(columns=table_columns)
+            extra_columns = [c for c in data.columns if c not in SIGNAL_COLUMNS]
+            extra = ([json.dumps(values) for values in data[extra_columns].astype(object)
+                      .where(data[extra_columns].notna(), None).to_dict('records')]
+                     if extra_columns else [None] * len(data))
+            self.connection.executemany(
+                f"INSERT INTO signals (run_id, {', '.join(table_columns)}, extra) "
+                f"VALUES ({', '.join('?' * (len(table_columns) + 2))})",
+                [(run_id, *row, extra_row) for row, extra_row in zip(_records(rows), extra)],
+            )
+        return run_id
+
+    def record_trades(self, data, name='backtest_results', source=None, params=None):
+        """Store a backtest_results table as a new run in one transaction; returns its run_id"""
+        with self.connection:
+            run_id = self._create_run(name, 'trades', data.columns, source, params)
+            self.connection.executemany(
+                f"INSERT INTO trades (run_id, {', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * (len(TRADE_COLUMNS) + 1))})",
+                [(run_id, *row) for row in _records(data.reindex(columns=TRADE_COLUMNS))],
+            )
+        return run_id
+
+    def import_csv(self, path, name=None):
+        """Import a signals or backtest CSV (or a stock/ signal file) as a new run"""
+        data = pd.read_csv(path)
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        if {'signal_date', 'status'} <= set(data.columns):
+            return self.record_trades(data, name=name, source=path)
+        return self.record_signals(data, name=name, source=path)
+
+    def import_all(self, root='.'):
+        """Import every signal, backtest and stock/ file under `root`; returns {path: run_id}"""
+        paths = sorted(glob.glob(os.path.join(root, '*_signals.csv')))
+        paths += [os.path.join(root, f) for f in ['nifty500_ema89_demo_results.csv', 'backtest_results.csv']]
+        paths.append(os.path.join(root, SIGNALS_METADATA_FILE))
+        return {path: self.import_csv(path) for path in paths if os.path.exists(path)}
+
+    def runs(self, name=None, kind=None):
+        """Recorded runs, newest first"""
+        query, params = 'SELECT * FROM runs WHERE 1=1', []
+        if name is not None:
+            query, params = query + ' AND name = ?', params + [name]
+        if kind is not None:
+            query, params = query + ' AND kind = ?', params + [kind]
+        return pd.read_sql_query(query + ' ORDER BY run_id DESC', self.connection, params=params)
+
+    def latest_run(self, name=None, source=None):
+        """run_id of the newest run with that name or source file, or None"""
+        if source is not None:
+            row = self.connection.execute('SELECT max(run_id) FROM runs WHERE source = ?',
+                                          (os.path.normpath(source),)).fetchone()
+        else:
+            row = self.connection.execute('SELECT max(run_id) FROM runs WHERE name = ?', (name,)).fetchone()
+        return row[0]
+
+    def _filters(self, filters):
+        """(WHERE clause, params) from column -> value (or (low, high) range, either end None)"""
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, tuple):
+                low, high = value
+                if low is not None:
+                    clauses, params = clauses + [f"{column} >= ?"], params + [low]
+                if high is not None:
+                    clauses, params = clauses + [f"{column} <= ?"], params + [high]
+            else:
+                clauses, params = clauses + [f"{column} = ?"], params + [value]
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def signals(self, run_id=None, name=None, symbol=None, start=None, end=None, market_cap=None, sector=None,
+                min_strength=None):
+        """Signals matching every given filter (dates inclusive, 'YYYY-MM-DD')
+
+        For a single run (`run_id`, or the latest run called `name`) the
+        result has that run's CSV columns in their original order;
+        otherwise it has every table column plus run_id.
+        """
+        if run_id is None and name is not None:
+            run_id = self.latest_run(name)
+            if run_id is None:
+                return pd.DataFrame()
+        where, params = self._filters({'run_id': run_id, 'symbol': symbol, 'date': (start, end),
+                                       'market_cap': market_cap, 'sector': sector,
+                                       'breakout_strength_percent': (min_strength, None)})
+        data = pd.read_sql_query(f"SELECT * FROM signals{where} ORDER BY id", self.connection, params=params)
+        if run_id is None:
+            return data.drop(columns=['id'])
+
+        columns = json.loads(self.connection.execute('SELECT columns FROM runs WHERE run_id = ?',
+                                                     (run_id,)).fetchone()[0])
+        if data['extra'].notna().any():
+            extra = pd.DataFrame([json.loads(values) for values in data['extra']], index=data.index)
+            data = pd.concat([data, extra], axis=1)
+        data = data.rename(columns={table: csv for csv, table in SIGNAL_COLUMNS.items()})
+        return data.reindex(columns=columns)
+
+    def trades(self, run_id=None, name=None, symbol=None, start=None, end=None, status=None):
+        """Trades matching every given filter (signal dates inclusive)"""
+        if run_id is None and name is not None:
+            run_id = self.latest_run(name)
+            if run_id is None:
+                return pd.DataFrame()
+        where, params = self._filters({'run_id': run_id, 'symbol': symbol, 'signal_date': (start, end),
+                                       'status': status})
+        data = pd.read_sql_query(f"SELECT * FROM trades{where} ORDER BY id", self.connection, params=params)
+        return data.drop(columns=['id']) if run_id is None else data[TRADE_COLUMNS]
+
+    def signal_counts(self, run_id, by='market_cap'):
+        """Signal count of a run per market cap, sector or symbol"""
+        if by not in ('market_cap', 'sector', 'symbol'):
+            raise ValueError(f"Cannot count signals by '{by}'")
+        return pd.read_sql_query(
+            f"SELECT {by}, count(*) AS signals FROM signals WHERE run_id = ? GROUP BY {by} ORDER BY signals DESC",
+            self.connection, params=[run_id])
+
+    def signals_for(self, path):
+        """The signals of a CSV file, from the latest run recorded for it (re-imported if the file changed)"""
+        run_id = self.latest_run(source=path)
+        if run_id is not None and os.path.exists(path):
+            recorded = self.connection.execute('SELECT source_mtime FROM runs WHERE run_id = ?', (run_id,)).fetchone()[0]
+            if recorded != os.path.getmtime(path):
+                run_id = None
+        if run_id is None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            run_id = self.import_csv(path)
+        return self.signals(run_id)
+
+
+_default_db = None
+
+
+def get_default_db():
+    """Return the process-wide SignalDatabase, opened once"""
+    global _default_db
+    if _default_db is None:
+        _default_db = SignalDatabase(os.environ.get('SIGNAL_DB_PATH', DEFAULT_DB_PATH))
+    return _default_db
+
+
+if __name__ == "__main__":
+    # python signal_db.py [file ...]: import the given files, or every known signal/backtest file
+    db = get_default_db()
+    imported = {path: db.import_csv(path) for path in sys.argv[1:]} if len(sys.argv) > 1 else db.import_all()
+    for path, run_id in imported.items():
+        print(f"Imported {path} as run {run_id}")
+    print(db.runs()[['run_id', 'name', 'kind', 'created_at', 'source']].to_string(index=False))
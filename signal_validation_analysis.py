@@ -1,45 +1,33 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
+from fetch_executor import get_default_executor
+from price_store import get_default_store
+from signal_db import get_default_db
+from indicators import IndicatorEngine
+from indicator_cache import get_default_cache
 
 class SignalValidationAnalyzer:
     def __init__(self):
+        self.price_store = get_default_store()
+        self.indicators = IndicatorEngine({'EMA_89_HA': ('HA_Close', 89)}, cache=get_default_cache())
+        self.fetch_executor = get_default_executor()
+        self.signal_db = get_default_db()
         self.validation_results = []
         
-    def calculate_heikin_ashi(self, df):
-        """Calculate Heikin Ashi candlesticks"""
-        ha_df = df.copy()
-        ha_df['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-        ha_df['HA_Open'] = 0.0
-        ha_df.iloc[0, ha_df.columns.get_loc('HA_Open')] = df.iloc[0]['Open']
-        
-        for i in range(1, len(ha_df)):
-            ha_df.iloc[i, ha_df.columns.get_loc('HA_Open')] = (ha_df.iloc[i-1]['HA_Open'] + ha_df.iloc[i-1]['HA_Close']) / 2
-        
-        ha_df['HA_High'] = ha_df[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-        ha_df['HA_Low'] = ha_df[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-        return ha_df
-    
-    def calculate_ema(self, prices, period):
-        """Calculate Exponential Moving Average"""
-        return prices.ewm(span=period).mean()
-    
     def find_actual_crossover(self, symbol, signal_date):
         """Find the actual first crossover date from chart analysis"""
         # Fetch extended data to find the true crossover
         end_date = datetime.now()
         start_date = end_date - timedelta(days=15 * 365)
         
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=start_date, end=end_date, interval='1mo')
+        data = self.price_store.get_history(symbol, start_date, end_date, interval='1mo')
         
         if data.empty:
             return None, None
         
-        data = self.calculate_heikin_ashi(data)
-        data['EMA_89_HA'] = self.calculate_ema(data['HA_Close'], 89)
+        # Heikin Ashi and EMAs in one engine pass
+        data = self.indicators.compute(data, symbol)
         
         # Find the first crossover (HA_Close crossing above EMA)
         first_crossover = None
@@ -108,12 +96,20 @@ class SignalValidationAnalyzer:
     def analyze_all_signals(self):
         """Analyze all signals from our results"""
         # Read our corrected results
-        results_df = pd.read_csv('corrected_nifty500_signals.csv')
+        results_df = self.signal_db.signals_for('corrected_nifty500_signals.csv')
         
         print("=== SIGNAL VALIDATION ANALYSIS ===")
         print(f"Total signals to validate: {len(results_df)}")
         print("=" * 60)
         
+        # Load each stock's history once, concurrently, before validating its signals
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=15 * 365)
+        self.fetch_executor.map(
+            lambda symbol: self.price_store.get_history(symbol, start_date, end_date, interval='1mo'),
+            results_df['Stock_Ticker'].unique(), label='history fetch'
+        )
+        
         for idx, row in results_df.iterrows():
             print(f"Validating {row['Stock_Ticker']} - {row['Date']}...")
             
@@ -124,8 +120,6 @@ class SignalValidationAnalyzer:
             print(f"  Difference: {validation['months_diff']} months")
             print(f"  Validity: {validation['validity']}")
             print("-" * 40)
-            
-            time.sleep(0.5)  # Rate limiting
     
     def generate_summary(self):
         """Generate validation summary"""
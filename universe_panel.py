@@ -0,0 +1,133 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from price_store import DEFAULT_STORE_ROOT, get_default_store
+
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_PANEL_PATH = os.path.join(DEFAULT_STORE_ROOT, 'panel_1mo')
+
+
+class UniversePanel:
+    """Whole-universe OHLCV array shaped [symbols, months, fields] on a shared month calendar
+
+    The array lives in a .npy file opened with np.memmap, so mapping the full
+    Nifty 500 history is free and multiprocessing workers can share it by
+    path instead of pickling frames. Missing bars (before listing, after
+    delisting) are NaN. Symbol and calendar metadata live in a JSON sidecar.
+    """
+
+    def __init__(self, values, symbols, dates, fields=PANEL_FIELDS, interval='1mo', path=None):
+        self.values = values
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.dates = pd.DatetimeIndex(dates)
+        self.fields = list(fields)
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+        self.interval = interval
+        self.path = path
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @staticmethod
+    def _files(path):
+        return path + '.npy', path + '.json'
+
+    @staticmethod
+    def _normalize_index(index):
+        """Bar labels as tz-naive dates so symbols from any source share one calendar"""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize()
+
+    @classmethod
+    def from_frames(cls, frames, path=DEFAULT_PANEL_PATH, dtype='float64', interval='1mo'):
+        """Write {symbol: OHLCV frame} to a memory-mapped panel file and return it opened read-only"""
+        frames = {symbol: data for symbol, data in frames.items() if data is not None and not data.empty}
+        symbols = sorted(frames)
+        calendar = pd.DatetimeIndex([])
+        for data in frames.values():
+            calendar = calendar.union(cls._normalize_index(data.index))
+
+        npy_path, meta_path = cls._files(path)
+        os.makedirs(os.path.dirname(npy_path) or '.', exist_ok=True)
+        values = np.lib.format.open_memmap(
+            npy_path, mode='w+', dtype=dtype, shape=(len(symbols), len(calendar), len(PANEL_FIELDS))
+        )
+        values[:] = np.nan
+        for i, symbol in enumerate(symbols):
+            data = frames[symbol]
+            positions = calendar.get_indexer(cls._normalize_index(data.index))
+            values[i, positions, :] = data[PANEL_FIELDS].to_numpy(dtype=dtype)
+        values.flush()
+        del values
+
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'symbols': symbols,
+                'dates': [d.strftime('%Y-%m-%d') for d in calendar],
+                'fields': PANEL_FIELDS,
+                'interval': interval,
+                'dtype': str(np.dtype(dtype)),
+            }, f)
+
+        return cls.open(path)
+
+    @classmethod
+    def build(cls, symbols, years=15, interval='1mo', price_store=None, path=DEFAULT_PANEL_PATH, dtype='float64'):
+        """Build a panel for `symbols` from the price store (fetching anything not cached)"""
+        price_store = price_store or get_default_store()
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=years * 365)
+
+        frames = {}
+        for symbol in symbols:
+            try:
+                frames[symbol] = price_store.get_history(symbol, start_date, end_date, interval=interval)
+            except Exception as e:
+                print(f"  Error loading {symbol} into panel: {e}")
+
+        panel = cls.from_frames(frames, path=path, dtype=dtype, interval=interval)
+        print(f"Built {interval} panel {panel.shape} at {path}.npy")
+        return panel
+
+    @classmethod
+    def open(cls, path=DEFAULT_PANEL_PATH, mode='r'):
+        """Memory-map an existing panel"""
+        npy_path, meta_path = cls._files(path)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        values = np.load(npy_path, mmap_mode=mode)
+        return cls(values, meta['symbols'], pd.to_datetime(meta['dates']),
+                   fields=meta['fields'], interval=meta['interval'], path=path)
+
+    def field(self, name):
+        """[symbols, months] view of one field"""
+        return self.values[:, :, self.field_index[name]]
+
+    def symbol_frame(self, symbol):
+        """One symbol's bars as a DataFrame, without the months it has no data for"""
+        data = pd.DataFrame(self.values[self.symbol_index[symbol]], index=self.dates, columns=self.fields)
+        data.index.name = 'Date'
+        return data.dropna(how='all')
+
+    def valid_mask(self):
+        """[symbols, months] boolean mask of bars that exist"""
+        return ~np.isnan(self.field('Close'))
+
+    def subset(self, symbols):
+        """In-memory panel restricted to `symbols` (in the given order)"""
+        rows = [self.symbol_index[symbol] for symbol in symbols]
+        return UniversePanel(np.asarray(self.values[rows]), symbols, self.dates,
+                             fields=self.fields, interval=self.interval)
+
+
+if __name__ == "__main__":
+    store = get_default_store()
+    UniversePanel.build(store.cached_symbols('1mo'), price_store=store)
@@ -0,0 +1,176 @@
+import csv
+import os
+
+import pandas as pd
+
+REGISTRY_FILE = 'universe_registry.csv'
+SIGNALS_METADATA_FILE = os.path.join('stock', 'Backtest Monthly HA and MACD')
+SYMBOL_SUFFIX = '.NS'
+DEFAULT_MARKET_CAP = 'Small Cap'
+
+# marketcapname values used in the stock/ signal files
+MARKET_CAP_LABELS = {
+    'Largecap': 'Large Cap',
+    'Midcap': 'Mid Cap',
+    'Smallcap': 'Small Cap',
+}
+
+REGISTRY_COLUMNS = ['symbol', 'market_cap', 'sector', 'aliases', 'universes']
+
+
+class UniverseRegistry:
+    """Versioned symbol registry: market cap, sector, former tickers and universe membership
+
+    Backed by one CSV whose first line carries the version. Everything is
+    indexed into dicts on load, so lookups are O(1) and any former ticker
+    (e.g. CADILAHC) resolves to the symbol it trades under today (ZYDUSLIFE).
+    Aliases are for renames of the same listed company only; a company that
+    was merged into another (HDFC into HDFCBANK) keeps its own history and
+    symbol.
+    Symbols are stored without the exchange suffix; lookups accept either.
+    """
+
+    def __init__(self, path=REGISTRY_FILE):
+        self.path = path
+        self.version = None
+        self.updated = None
+        self.entries = {}
+        self.aliases = {}
+        self.universes = {}
+        self.load()
+
+    @staticmethod
+    def base_symbol(symbol):
+        """'TCS.NS' -> 'TCS'"""
+        symbol = symbol.strip().upper()
+        if symbol.endswith(SYMBOL_SUFFIX):
+            symbol = symbol[:-len(SYMBOL_SUFFIX)]
+        return symbol
+
+    def load(self):
+        """(Re)build the hash indexes from the registry file"""
+        self.entries, self.aliases, self.universes = {}, {}, {}
+        if not os.path.exists(self.path):
+            print(f"Universe registry {self.path} not found; every symbol defaults to {DEFAULT_MARKET_CAP}")
+            return
+
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            header = f.readline()
+            fields = dict(part.split('=', 1) for part in header.lstrip('#').split() if '=' in part)
+            self.version = int(fields.get('version', 0))
+            self.updated = fields.get('updated')
+
+            for row in csv.DictReader(f):
+                symbol = row['symbol']
+                self.entries[symbol] = {
+                    'market_cap': row['market_cap'],
+                    'sector': row['sector'] or None,
+                    'aliases': [a for a in row['aliases'].split(';') if a],
+                }
+                for alias in self.entries[symbol]['aliases']:
+                    self.aliases[alias] = symbol
+                for name in filter(None, row['universes'].split(';')):
+                    self.universes.setdefault(name, []).append(symbol)
+
+    def save(self):
+        """Write the registry back, bumping its version"""
+        self.version = (self.version or 0) + 1
+        self.updated = pd.Timestamp.now().strftime('%Y-%m-%d')
+        membership = {}
+        for name, symbols in self.universes.items():
+            for symbol in symbols:
+                membership.setdefault(symbol, []).append(name)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(f"# version={self.version} updated={self.updated}\n")
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(REGISTRY_COLUMNS)
+            for symbol in sorted(self.entries):
+                entry = self.entries[symbol]
+                writer.writerow([symbol, entry['market_cap'], entry['sector'] or '',
+                                 ';'.join(entry['aliases']), ';'.join(membership.get(symbol, []))])
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, symbol):
+        """Current ticker (without suffix) for a symbol or any of its former tickers"""
+        symbol = self.base_symbol(symbol)
+        return self.aliases.get(symbol, symbol)
+
+    def ticker(self, symbol):
+        """Current Yahoo ticker for a symbol, e.g. 'CADILAHC' -> 'ZYDUSLIFE.NS'"""
+        return self.resolve(symbol) + SYMBOL_SUFFIX
+
+    def __contains__(self, symbol):
+        return self.resolve(symbol) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, symbol):
+        """Registry entry for a symbol, or None if it is unknown"""
+        return self.entries.get(self.resolve(symbol))
+
+    def market_cap(self, symbol, default=DEFAULT_MARKET_CAP):
+        entry = self.get(symbol)
+        return entry['market_cap'] if entry is not None else default
+
+    def sector(self, symbol, default=None):
+        entry = self.get(symbol)
+        return entry['sector'] if entry is not None and entry['sector'] else default
+
+    def classify(self, symbols):
+        """{ticker: market cap} for arbitrary symbols, with renamed and repeated tickers collapsed"""
+        stocks = {}
+        for symbol in symbols:
+            ticker = self.ticker(symbol)
+            if ticker not in stocks:
+                stocks[ticker] = self.market_cap(ticker)
+        return stocks
+
+    def universe(self, name='nifty500'):
+        """{ticker: market cap} for a named universe"""
+        if name not in self.universes:
+            raise KeyError(f"Unknown universe '{name}' (registry has {sorted(self.universes)})")
+        return self.classify(self.universes[name])
+
+    def update_from_signals(self, path=SIGNALS_METADATA_FILE):
+        """Merge market cap and sector from a stock/ signal file (date, symbol, marketcapname, sector)
+
+        The newest row per symbol wins. Returns the number of entries added or changed.
+        """
+        data = pd.read_csv(path)
+        data['date'] = pd.to_datetime(data['date'], format='%d-%m-%Y')
+        latest = data.sort_values('date').groupby('symbol').last()
+
+        changed = 0
+        for symbol, row in latest.iterrows():
+            symbol = self.resolve(symbol)
+            entry = self.entries.setdefault(symbol, {'market_cap': DEFAULT_MARKET_CAP, 'sector': None, 'aliases': []})
+            market_cap = MARKET_CAP_LABELS.get(row['marketcapname'], entry['market_cap'])
+            sector = row['sector'] if isinstance(row['sector'], str) else entry['sector']
+            if (market_cap, sector) != (entry['market_cap'], entry['sector']):
+                entry['market_cap'], entry['sector'] = market_cap, sector
+                changed += 1
+        return changed
+
+
+_default_registry = None
+
+
+def get_default_registry():
+    """Return the process-wide UniverseRegistry, loaded once"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = UniverseRegistry()
+    return _default_registry
+
+
+if __name__ == "__main__":
+    registry = get_default_registry()
+    changed = registry.update_from_signals()
+    if changed:
+        registry.save()
+    print(f"Universe registry v{registry.version}: {len(registry)} symbols, {changed} updated from signal metadata")
+    for name, symbols in registry.universes.items():
+        print(f"  {name}: {len(symbols)} symbols")
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from membership_index import get_default_membership
+from price_store import DEFAULT_STORE_ROOT
+from rule_dsl import get_rule
+from signal_db import get_default_db
+from universe_panel import PANEL_FIELDS, UniversePanel
+from universe_registry import get_default_registry
+
+
+def pack_bars(valid):
+    """(rows, bars, months) of every real bar, with bars counted from each row's first real bar
+
+    Rule shifts count bars, so a row whose listing starts late or that has
+    missing months is re-laid out as [symbols, bars] with its real bars
+    contiguous from the left, exactly like that symbol's own frame.
+    """
+    bars_seen = np.cumsum(valid, axis=1)
+    rows, months = np.nonzero(valid)
+    return rows, bars_seen[rows, months] - 1, months
+
+
+class UniverseScanner:
+    """Cross-sectional scan: one SignalRule over every symbol of a UniversePanel in a single pass
+
+    Indicators and the rule are evaluated as [symbols, bars] arrays and the
+    signals come back sparse, as (symbol_idx, month_idx) plus the rule's
+    report columns, from which the analyzers' output table is built in bulk.
+    Each symbol gets exactly the signals its per-symbol analyzer finds for
+    the same bars.
+    """
+
+    def __init__(self, rule='improved', registry=None, membership=None, signal_db=None):
+        self.rule = get_rule(rule) if isinstance(rule, str) else rule
+        self.engine = IndicatorEngine(self.rule.emas)
+        self.registry = registry or get_default_registry()
+        self.membership = membership or get_default_membership()
+        self.signal_db = signal_db or get_default_db()
+
+    def scan(self, panel, members=None):
+        """Sparse signals of a panel: {'symbol_idx', 'month_idx', <report column>: array}
+
+        `members` is an optional [symbols, months] mask (see MembershipIndex.panel_mask);
+        months outside it never signal.
+        """
+        rows, bars, months = pack_bars(panel.valid_mask())
+        width = bars.max() + 1 if len(bars) else 0
+
+        def packed(values, fill=np.nan):
+            result = np.full((len(panel.symbols), width), fill, dtype=np.asarray(values).dtype)
+            result[rows, bars] = values[rows, months]
+            return result
+
+        data = {field: packed(panel.field(field)) for field in PANEL_FIELDS}
+        data.update(self.engine.compute_arrays(*(data[c] for c in ['Open', 'High', 'Low', 'Close'])))
+        mask, report = self.rule.evaluate(data)
+        if members is not None:
+            mask &= packed(np.asarray(members, dtype=bool), fill=False)
+
+        signal_rows, signal_bars = np.nonzero(mask)
+        month_of = np.full(mask.shape, -1)
+        month_of[rows, bars] = months
+        signals = {'symbol_idx': signal_rows, 'month_idx': month_of[signal_rows, signal_bars]}
+        signals.update({column: values[signal_rows, signal_bars] for column, values in report.items()})
+        return signals
+
+    def to_table(self, panel, signals, stocks):
+        """Signals as the analyzers' output table (Date, Stock_Ticker, Market_Cap, report columns)
+
+        Rows come in `stocks` order and then by date, as the per-symbol loop
+        appends them, so the saved table sorts to the same order too.
+        """
+        position = {symbol: i for i, symbol in enumerate(stocks)}
+        rank = np.array([position.get(symbol, len(position)) for symbol in panel.symbols])
+        order = np.lexsort((signals['month_idx'], rank[signals['symbol_idx']]))
+        symbols = np.array(panel.symbols, dtype=object)[signals['symbol_idx'][order]]
+        caps = np.array([stocks.get(s) for s in panel.symbols], dtype=object)
+        table = pd.DataFrame({
+            'Date': panel.dates[signals['month_idx'][order]].strftime('%Y-%m-%d'),
+            'Stock_Ticker': pd.Series(symbols, dtype=object).str.replace('.NS', '', regex=False),
+            'Market_Cap': caps[signals['symbol_idx'][order]],
+        })
+        for column in self.rule.report:
+            table[column] = np.round(signals[column][order], 2)
+        return table
+
+    def run(self, universe='sample', years=15, output=None, panel_path=None):
+        """Scan a registry universe in one pass and save the table in its analyzer's format"""
+        output = output or f"{self.rule.name}_nifty500_signals.csv"
+        panel_path = panel_path or os.path.join(DEFAULT_STORE_ROOT, f'panel_1mo_{universe}')
+
+        # Same stock list and membership filtering as the per-symbol analyzers
+        stocks = self.membership.filter_members(self.registry.universe(universe), years=years)
+        panel = UniversePanel.build(list(stocks), years=years, path=panel_path)
+
+        start = time.perf_counter()
+        signals = self.scan(panel, members=self.membership.panel_mask(panel))
+        table = self.to_table(panel, signals, stocks)
+        seconds = time.perf_counter() - start
+        print(f"Scanned {len(panel.symbols)} symbols x {len(panel.dates)} months with the {self.rule.name} rule "
+              f"in {seconds:.3f}s: {len(table)} signals")
+
+        if table.empty:
+            print(f"No {self.rule.name} signals found matching all criteria.")
+            return table
+        table = table.sort_values('Date', ascending=False)
+        table.to_csv(output, index=False)
+        self.signal_db.record_signals(table, os.path.splitext(os.path.basename(output))[0], source=output,
+                                      params={'rule': self.rule.name, 'universe': universe, 'years': years})
+        print(f"Results saved to '{output}'")
+        return table
+
+
+if __name__ == "__main__":
+    UniverseScanner(sys.argv[1] if len(sys.argv) > 1 else 'improved').run(*sys.argv[2:3])